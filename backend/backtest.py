@@ -0,0 +1,201 @@
+"""Walk-forward backtest of the served models on stored price history.
+
+For every forecast origin (a day t in the ticker's history) the window ending
+at t is scaled the way /predict would have scaled it on that day, i.e. with
+the min/max of the closes up to t, and rolled out with the serving backend.
+All origins of a ticker go through one batched rollout per model, so a
+ticker costs a handful of forward passes instead of one /predict per day.
+
+Per model and horizon h it reports, against the close h trading days later:
+  mape       mean absolute percentage error
+  naive      MAPE of repeating the close at t (no-change forecast)
+  skill      1 - mape / naive; above 0 beats the no-change forecast
+  direction  share of forecasts on the right side of the close at t
+
+Bars come from the price store; tickers that are not stored yet are fetched
+once unless --offline. train_model.py holds out the last 20% of each training
+ticker's windows, so earlier origins of those tickers are in-sample.
+
+Run from backend/:
+    python backtest.py --tickers AAPL MSFT NVDA --time-steps 5 120
+    python backtest.py --universe symbols.csv --origins 1000 --output backtest.json
+"""
+import argparse
+import json
+import os
+import time
+from concurrent.futures import as_completed
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+import config
+import utils
+from materialize import load_universe
+from pool import process_pool
+from price_store import PriceStore, yfinance_fetcher
+from scaler_cache import minmax_params
+
+HORIZONS = [1, 5, 10, 20, 60, 120]
+METRICS = ("mape", "naive", "direction")
+
+
+def scaled_windows(close, origins, time_steps):
+    # MinMaxScaler parameters each origin would have been served with: the
+    # range of every close up to and including the origin
+    low = np.minimum.accumulate(close)[origins]
+    high = np.maximum.accumulate(close)[origins]
+    scale, offset = minmax_params(low, high)
+    windows = sliding_window_view(close, time_steps)[origins - time_steps + 1]
+    windows = (windows * scale[:, None] + offset[:, None]).astype(np.float32)
+    return windows[..., np.newaxis], scale, offset
+
+
+def forecast(close, origins, time_steps, predict_days, batch_size):
+    windows, scale, offset = scaled_windows(close, origins, time_steps)
+    scaled = np.concatenate([utils.run_rollout(time_steps, windows[i:i + batch_size], predict_days)
+                             for i in range(0, len(windows), batch_size)])
+    return (scaled - offset[:, None]) / scale[:, None]
+
+
+def horizon_errors(close, origins, predictions, horizons):
+    # Per-horizon error sums; summarize() turns them into means
+    base = close[origins]
+    rows = {}
+    for h in horizons:
+        actual = close[origins + h]
+        predicted = predictions[:, h - 1]
+        rows[h] = {
+            "n": len(origins),
+            "abs": float(np.abs(predicted - actual).sum()),
+            "sq": float(np.square(predicted - actual).sum()),
+            "mape": float((np.abs(predicted - actual) / actual).sum()),
+            "naive": float((np.abs(base - actual) / actual).sum()),
+            "direction": float((np.sign(predicted - base) == np.sign(actual - base)).sum()),
+        }
+    return rows
+
+
+def backtest_ticker(ticker, time_steps_list, horizons, origins, stride, batch_size, offline=False, price_root=None):
+    # Runs in a worker process; models load once per process and stay cached in utils
+    fetcher = (lambda ticker, start=None: None) if offline else yfinance_fetcher
+    frame = PriceStore(price_root, fetcher, stale_after=float("inf")).get(ticker)
+    if frame is None:
+        return ticker, {"error": "No stored history"}
+    close = frame['Close'].to_numpy(dtype=np.float64)
+    predict_days = max(horizons)
+
+    results = {}
+    for time_steps in time_steps_list:
+        try:
+            window = utils.window_length(time_steps)
+            # The newest origins whose every horizon has a known close, stride bars apart
+            candidates = np.arange(len(close) - 1 - predict_days, window - 2, -stride)[:origins][::-1]
+            if len(candidates) == 0:
+                results[time_steps] = {"error": "Not enough history"}
+                continue
+            start = time.perf_counter()
+            predictions = forecast(close, candidates, window, predict_days, batch_size)
+            errors = horizon_errors(close, candidates, predictions, horizons)
+            results[time_steps] = {
+                "seconds": time.perf_counter() - start,
+                "first_origin": str(frame.index[candidates[0]].date()),
+                "last_origin": str(frame.index[candidates[-1]].date()),
+                "horizons": {h: summarize(sums) for h, sums in errors.items()},
+            }
+        except Exception as e:
+            results[time_steps] = {"error": str(e)}
+    return ticker, results
+
+
+def summarize(sums):
+    n = sums["n"]
+    summary = {"n": n, **{metric: sums[metric] / n for metric in METRICS}}
+    summary["skill"] = 1 - summary["mape"] / summary["naive"] if summary["naive"] else None
+    if "abs" in sums:
+        summary.update(mae=sums["abs"] / n, rmse=float(np.sqrt(sums["sq"] / n)))
+    return summary
+
+
+def pooled(per_ticker, time_steps, horizon):
+    # Percentage metrics pooled over every origin of every ticker; MAE/RMSE are
+    # in each ticker's own prices, so they are only reported per ticker
+    sums = {"n": 0, **{metric: 0.0 for metric in METRICS}}
+    for results in per_ticker.values():
+        row = results.get(time_steps, {}).get("horizons", {}).get(horizon)
+        if row is not None:
+            sums["n"] += row["n"]
+            for metric in METRICS:
+                sums[metric] += row[metric] * row["n"]
+    return summarize(sums) if sums["n"] else None
+
+
+def backtest(tickers, time_steps_list, horizons, origins, stride, batch_size, workers, offline=False, price_root=None):
+    per_ticker = {}
+    with process_pool(workers) as pool:
+        futures = [pool.submit(backtest_ticker, ticker, time_steps_list, horizons, origins, stride, batch_size,
+                               offline, price_root) for ticker in tickers]
+        for future in as_completed(futures):
+            ticker, results = future.result()
+            per_ticker[ticker] = results
+    return per_ticker
+
+
+def report(per_ticker, time_steps_list, horizons):
+    summary = {}
+    for time_steps in time_steps_list:
+        summary[time_steps] = {h: pooled(per_ticker, time_steps, h) for h in horizons}
+        print(f"\nmodel_{time_steps}")
+        print(f"{'horizon':>8} {'n':>8} {'mape %':>8} {'naive %':>8} {'skill':>7} {'direction %':>12}")
+        for h, row in summary[time_steps].items():
+            if row is not None:
+                skill = row['skill'] if row['skill'] is not None else float("nan")
+                print(f"{h:>8} {row['n']:>8} {row['mape'] * 100:>8.2f} {row['naive'] * 100:>8.2f} "
+                      f"{skill:>7.3f} {row['direction'] * 100:>12.1f}")
+    failed = {}
+    for ticker, results in per_ticker.items():
+        errors = {t: r["error"] for t, r in results.items() if "error" in r} if "error" not in results else results
+        if errors:
+            failed[ticker] = errors
+    if failed:
+        print(f"\nFailed: {failed}")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--universe", default=config.SYMBOL_INDEX_PATH, help="Symbol listing CSV to backtest")
+    parser.add_argument("--tickers", nargs="+", help="Explicit tickers instead of the universe file")
+    parser.add_argument("--time-steps", type=int, nargs="+", help="Models to test (default: all available)")
+    parser.add_argument("--horizons", type=int, nargs="+", default=HORIZONS, help="Forecast days to score")
+    parser.add_argument("--origins", type=int, default=500, help="Most forecast origins per ticker, newest first")
+    parser.add_argument("--stride", type=int, default=1, help="Trading days between origins")
+    parser.add_argument("--batch-size", type=int, default=1024, help="Windows per rollout")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--offline", action="store_true", help="Skip tickers without stored prices")
+    parser.add_argument("--output", help="Write per-ticker and pooled results as JSON here")
+    args = parser.parse_args()
+
+    tickers = [t.upper() for t in args.tickers] if args.tickers else load_universe(args.universe)
+    time_steps_list = args.time_steps or utils.available_time_steps()
+    horizons = sorted(set(args.horizons))
+
+    start = time.perf_counter()
+    workers = max(1, min(args.workers, len(tickers)))
+    per_ticker = backtest(tickers, time_steps_list, horizons, args.origins, args.stride, args.batch_size,
+                          workers, args.offline)
+    print(f"Backtested {len(tickers)} tickers x {len(time_steps_list)} models "
+          f"in {time.perf_counter() - start:.1f}s with {workers} workers")
+    summary = report(per_ticker, time_steps_list, horizons)
+
+    if args.output:
+        results = {"backend": config.INFERENCE_BACKEND, "forecast_model": config.FORECAST_MODEL,
+                   "horizons": horizons, "origins": args.origins, "stride": args.stride,
+                   "summary": summary, "tickers": per_ticker}
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""Forecast latency per predict_days: per-day model.predict loop vs compiled rollout.
+
+Run from backend/:  python benchmarks/bench_forecast.py [--time-steps 60] [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import get_model, get_rollout  # noqa: E402
+from timing import best_of  # noqa: E402
+
+PREDICT_DAYS = [1, 5, 10, 20, 60, 120]
+
+
+def predict_loop(model, input_data, predict_days):
+    # The original make_prediction loop, kept as the baseline
+    predictions = []
+    current_input = input_data.copy()
+    for _ in range(predict_days):
+        pred = model.predict(current_input, verbose=0)
+        predictions.append(pred[0][0])
+        current_input = np.append(current_input[:, 1:, :], pred.reshape(1, 1, 1), axis=1)
+    return np.array(predictions)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--time-steps", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    model = get_model(args.time_steps)
+    rollout = get_rollout(args.time_steps)
+    input_data = np.random.default_rng(0).random((1, args.time_steps, 1), dtype=np.float32)
+    rollout(input_data, np.int32(1))  # Trace once up front
+
+    print(f"time_steps={args.time_steps}")
+    print(f"{'predict_days':>12} {'loop ms':>10} {'rollout ms':>11} {'speedup':>8} {'max diff':>10}")
+    for predict_days in PREDICT_DAYS:
+        loop_s, expected = best_of(lambda: predict_loop(model, input_data, predict_days), args.repeat)
+        rollout_s, actual = best_of(lambda: rollout(input_data, np.int32(predict_days)).numpy()[0], args.repeat)
+        diff = float(np.abs(expected - actual).max())
+        print(f"{predict_days:>12} {loop_s * 1000:>10.1f} {rollout_s * 1000:>11.1f} {loop_s / rollout_s:>7.1f}x {diff:>10.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Indicator cost on long histories: pandas recompute vs IndicatorEngine update.
+
+Run from backend/:  python benchmarks/bench_indicators.py [--bars 2500 10000 15000]
+"""
+import argparse
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from indicators import IndicatorEngine, compute_indicators  # noqa: E402
+from synthetic import synthetic_history  # noqa: E402
+from timing import best_of  # noqa: E402
+
+
+def max_rel_diff(actual, expected):
+    columns = [(actual['rsi'], expected['rsi']), (actual['sma50'], expected['sma50']),
+               (actual['ema200'], expected['ema200'])]
+    columns += [(actual['macd'][k], expected['macd'][k]) for k in expected['macd']]
+    worst = 0.0
+    for a, e in columns:
+        if not np.array_equal(np.isnan(a), np.isnan(e)):
+            return float("inf")
+        mask = ~np.isnan(e)
+        worst = max(worst, float(np.max(np.abs(a[mask] - e[mask]) / np.maximum(1, np.abs(e[mask])), initial=0)))
+    return worst
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bars", type=int, nargs="+", default=[2500, 10000, 15000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'bars':>6} {'pandas ms':>10} {'build ms':>9} {'update ms':>10} {'speedup':>8} {'max rel diff':>13}")
+    for bars in args.bars:
+        close = synthetic_history(bars + 1, seed=bars)['Close']
+        pandas_s, _ = best_of(lambda: compute_indicators(close), args.repeat)
+
+        engine = IndicatorEngine()
+        build_s, _ = best_of(lambda: IndicatorEngine().compute("X", close.iloc[:-1]), args.repeat)
+        engine.compute("X", close.iloc[:-1])
+        # One new bar on top of the stored state, as after a daily refresh
+        update_s, actual = best_of(lambda: engine.compute("X", close), args.repeat)
+        diff = max_rel_diff(actual, compute_indicators(close))
+        print(f"{bars:>6} {pandas_s * 1000:>10.2f} {build_s * 1000:>9.2f} {update_s * 1000:>10.3f} "
+              f"{pandas_s / update_s:>7.1f}x {diff:>13.1e}")
+
+
+if __name__ == "__main__":
+    main()
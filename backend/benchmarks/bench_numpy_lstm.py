@@ -0,0 +1,85 @@
+"""NumPy LSTM engine vs Keras: parity check and microbenchmark.
+
+Run from backend/:  python benchmarks/bench_numpy_lstm.py [--time-steps 5 60] [--repeat 5]
+
+Exits non-zero if any NumPy output differs from model.predict by more than
+--tolerance, or if no Keras reference could be built for a model; those are
+still benchmarked, but reported as unverified.
+"""
+import argparse
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from numpy_lstm import NumpyLSTM  # noqa: E402
+from timing import best_of  # noqa: E402
+
+BATCH_SIZES = [1, 16, 64, 256]
+
+
+def keras_reference(utils, time_steps):
+    # The model as the keras backend serves it (see utils.get_model), or None
+    path = f"models/model_{time_steps}.h5"
+    try:
+        return utils.load_model(path)
+    except Exception:
+        pass
+    try:
+        model = utils.build_model(time_steps)
+        model.load_weights(path)
+        return model
+    except Exception as e:
+        print(f"model_{time_steps}: no Keras reference ({e})")
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--time-steps", type=int, nargs="+", default=[1, 5, 10, 20, 60, 120])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--predict-days", type=int, default=30)
+    parser.add_argument("--tolerance", type=float, default=1e-4)
+    args = parser.parse_args()
+
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    os.environ['INFERENCE_BACKEND'] = 'keras'  # utils only imports TensorFlow for it
+    import utils
+
+    rng = np.random.default_rng(0)
+    failures = 0
+    unverified = []
+    print(f"{'steps':>5} {'batch':>5} {'keras ms':>9} {'numpy ms':>9} {'speedup':>8} {'max diff':>9} "
+          f"{'rollout ms':>11}")
+    for time_steps in args.time_steps:
+        engine = NumpyLSTM.from_h5(f"models/model_{time_steps}.h5")
+        model = keras_reference(utils, time_steps)
+        if model is None:
+            unverified.append(time_steps)
+        for batch in BATCH_SIZES:
+            x = rng.random((batch, time_steps, 1), dtype=np.float32)
+            numpy_s, actual = best_of(lambda: engine.predict(x), args.repeat)
+            rollout_s, _ = best_of(lambda: engine.rollout(x, args.predict_days), 1)
+            if model is not None:
+                keras_s, expected = best_of(lambda: model.predict(x, verbose=0), args.repeat)
+                diff = float(np.abs(actual - expected).max())
+                failures += diff > args.tolerance
+                keras_col, speedup = f"{keras_s * 1000:>9.2f}", f"{keras_s / numpy_s:>7.1f}x"
+                diff_col = f"{diff:>9.1e}"
+            else:
+                keras_col, speedup, diff_col = f"{'n/a':>9}", f"{'':>8}", f"{'n/a':>9}"
+            print(f"{time_steps:>5} {batch:>5} {keras_col} {numpy_s * 1000:>9.2f} {speedup} {diff_col} "
+                  f"{rollout_s * 1000:>11.1f}")
+
+    if unverified:
+        print(f"Unverified (no Keras reference): {', '.join(f'model_{t}' for t in unverified)}")
+    if failures:
+        print(f"{failures} parity check(s) exceeded tolerance {args.tolerance}")
+    if failures or unverified:
+        sys.exit(1)
+    print("parity ok")
+
+
+if __name__ == "__main__":
+    main()
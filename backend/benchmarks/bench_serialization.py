@@ -0,0 +1,69 @@
+"""/predict payload build time: list comprehension + FastAPI encoding vs orjson.
+
+Run from backend/:  python benchmarks/bench_serialization.py [--bars 2500 10000 15000]
+"""
+import argparse
+import json
+import os
+import sys
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from indicators import compute_indicators  # noqa: E402
+from serialization import dumps, format_dates  # noqa: E402
+from synthetic import synthetic_history  # noqa: E402
+from timing import best_of  # noqa: E402
+
+
+def replace_nan_with_none(lst):
+    return [None if pd.isna(x) else x for x in lst]
+
+
+def legacy_payload(data, indicators, predictions):
+    # What main.py did before: tolist(), per-value NaN scan, then FastAPI's encoder
+    response = {
+        "historical": {"dates": data.index.strftime("%Y-%m-%d").tolist(), "prices": data['Close'].values.tolist()},
+        "predicted": {"dates": [], "prices": predictions.tolist()},
+        "indicators": {
+            'rsi': replace_nan_with_none(indicators['rsi'].tolist()),
+            'macd': {k: replace_nan_with_none(v.tolist()) for k, v in indicators['macd'].items()},
+            'sma50': replace_nan_with_none(indicators['sma50'].tolist()),
+            'ema200': replace_nan_with_none(indicators['ema200'].tolist()),
+        },
+    }
+    return json.dumps(jsonable_encoder(response), ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def fast_payload(data, indicators, predictions):
+    response = {
+        "historical": {"dates": format_dates(data.index), "prices": data['Close'].to_numpy()},
+        "predicted": {"dates": [], "prices": predictions},
+        "indicators": indicators,
+    }
+    return dumps(response)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bars", type=int, nargs="+", default=[250, 2500, 10000, 15000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'bars':>6} {'legacy ms':>10} {'orjson ms':>10} {'speedup':>8} {'bytes':>10} {'same':>5}")
+    for bars in args.bars:
+        data = synthetic_history(bars, seed=bars)
+        indicators = compute_indicators(data['Close'])
+        predictions = np.linspace(1, 2, 120)
+        legacy_s, legacy = best_of(lambda: legacy_payload(data, indicators, predictions), args.repeat)
+        fast_s, fast = best_of(lambda: fast_payload(data, indicators, predictions), args.repeat)
+        same = json.loads(legacy) == json.loads(fast)
+        print(f"{bars:>6} {legacy_s * 1000:>10.2f} {fast_s * 1000:>10.2f} {legacy_s / fast_s:>7.1f}x "
+              f"{len(fast):>10} {str(same):>5}")
+
+
+if __name__ == "__main__":
+    main()
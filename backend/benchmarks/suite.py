@@ -0,0 +1,257 @@
+"""Offline end-to-end benchmark of the FastAPI app with synthetic market data.
+
+The price store fetcher and the Yahoo search call are swapped for
+deterministic local fakes, then `main.app` is driven in-process to measure:
+  latency     /predict per time_steps x predict_days (computed and cached)
+  indicators  compute_indicators and IndicatorEngine cost per history length
+  payload     /predict body size per period and encoding
+  throughput  concurrent /predict requests per second
+  search      /search_ticker through the search cache
+
+Results are written as JSON so runs can be compared across commits.
+
+Run from backend/:
+    python benchmarks/suite.py --output bench.json [--quick]
+    python benchmarks/suite.py --compare before.json after.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Isolated stores and no bundled symbol index, so every search reaches the fake upstream
+_scratch = tempfile.mkdtemp(prefix="stockpredictor-bench-")
+os.environ.setdefault("PRICE_STORE_DIR", os.path.join(_scratch, "prices"))
+os.environ.setdefault("FORECAST_STORE_DIR", os.path.join(_scratch, "forecasts"))
+os.environ["SYMBOL_INDEX_PATH"] = ""
+os.environ["WARM_UP_MODELS"] = "0"
+
+import httpx  # noqa: E402
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+import config  # noqa: E402
+import main  # noqa: E402
+import utils  # noqa: E402
+from indicators import IndicatorEngine, compute_indicators  # noqa: E402
+from price_store import PriceStore  # noqa: E402
+from synthetic import synthetic_history  # noqa: E402
+from timing import best_of  # noqa: E402
+
+HISTORY_BARS = 10000
+PREDICT_DAYS = [1, 5, 20, 60, 120]
+INDICATOR_BARS = [250, 1000, 2500, 10000]
+CONCURRENCY = [1, 8, 32]
+
+
+def synthetic_fetcher(ticker, start=None):
+    # Same bars for the same ticker on every run; start slices like yfinance would
+    data = synthetic_history(HISTORY_BARS, seed=zlib.crc32(ticker.encode()))
+    return data if start is None else data[data.index >= start]
+
+
+def fake_search(request):
+    query = request.url.params.get("q", "").upper()
+    quotes = [{"symbol": f"{query}{i}", "shortname": f"{query} Corp {i}", "exchange": "NMS", "quoteType": "EQUITY"}
+              for i in range(main.SEARCH_QUOTES_COUNT)]
+    return httpx.Response(200, json={"quotes": quotes})
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {"n": len(samples), "min_ms": samples[0] * 1000, "p50_ms": statistics.median(samples) * 1000,
+            "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000}
+
+
+async def post_predict(client, body, params=None):
+    start = time.perf_counter()
+    response = await client.post("/predict", json=body, params=params)
+    elapsed = time.perf_counter() - start
+    if response.status_code != 200:
+        raise RuntimeError(f"/predict {body} -> {response.status_code}")
+    return elapsed, response
+
+
+async def bench_latency(client, time_steps_list, predict_days_list, repeat):
+    rows = []
+    for time_steps in time_steps_list:
+        for predict_days in predict_days_list:
+            body = {"ticker": "BENCH", "period": "1y", "time_steps": time_steps, "predict_days": predict_days}
+            computed = []
+            for _ in range(repeat):
+                main.response_cache.entries.clear()
+                elapsed, response = await post_predict(client, body)
+                computed.append(elapsed)
+            error = json.loads(response.content).get("error")
+            cached = [(await post_predict(client, body))[0] for _ in range(repeat)]
+            rows.append({"time_steps": time_steps, "predict_days": predict_days, "error": error,
+                         "computed": summarize(computed), "cached": summarize(cached)})
+            print(f"latency  T={time_steps:<4} days={predict_days:<4} "
+                  f"{rows[-1]['computed']['p50_ms']:8.1f} ms (cached {rows[-1]['cached']['p50_ms']:.2f} ms)"
+                  + (f"  error: {error}" if error else ""))
+    return rows
+
+
+def bench_indicators(bars_list, repeat):
+    rows = []
+    for bars in bars_list:
+        close = synthetic_history(bars + 1, seed=bars)['Close']
+        full, _ = best_of(lambda: compute_indicators(close[:-1]), repeat)
+        engine = IndicatorEngine()
+        engine.compute("BENCH", close[:-1])
+        update, _ = best_of(lambda: engine.compute("BENCH", close), repeat)
+        rows.append({"bars": bars, "full_ms": full * 1000, "update_ms": update * 1000})
+        print(f"indicators bars={bars:<6} full {full * 1000:7.2f} ms  update {update * 1000:6.3f} ms")
+    return rows
+
+
+async def bench_payload(client, time_steps):
+    rows = []
+    for period in ["1y", "5y", "max"]:
+        body = {"ticker": "BENCH", "period": period, "time_steps": time_steps, "predict_days": 30}
+        for name, params in [("json", None), ("compact", {"format": "compact"}),
+                             ("compact_1000", {"format": "compact", "max_points": 1000})]:
+            _, response = await post_predict(client, body, params)
+            rows.append({"period": period, "encoding": name, "bytes": len(response.content)})
+            print(f"payload  period={period:<4} {name:<13} {len(response.content):>9} bytes")
+    return rows
+
+
+async def bench_throughput(client, time_steps, levels, requests):
+    rows = []
+    tickers = [f"LOAD{i:03d}" for i in range(requests)]
+    for ticker in tickers:
+        utils.price_store.get(ticker)  # Bars in memory: measure serving, not data generation
+    for concurrency in levels:
+        main.response_cache.entries.clear()
+        limit = asyncio.Semaphore(concurrency)
+
+        async def one(ticker):
+            async with limit:
+                body = {"ticker": ticker, "period": "1y", "time_steps": time_steps, "predict_days": 30}
+                return (await post_predict(client, body))[0]
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(one(ticker) for ticker in tickers))
+        wall = time.perf_counter() - start
+        rows.append({"concurrency": concurrency, "requests": requests, "wall_s": wall,
+                     "requests_per_s": requests / wall, **summarize(latencies)})
+        print(f"throughput c={concurrency:<3} {requests / wall:7.1f} req/s  p95 {rows[-1]['p95_ms']:.1f} ms")
+    return rows
+
+
+async def bench_search(client, queries):
+    samples = {"miss": [], "hit": []}
+    for kind in ("miss", "hit"):
+        for query in queries:
+            start = time.perf_counter()
+            response = await client.get("/search_ticker", params={"query": query})
+            samples[kind].append(time.perf_counter() - start)
+            if response.status_code != 200:
+                raise RuntimeError(f"/search_ticker {query} -> {response.status_code}")
+    result = {kind: summarize(values) for kind, values in samples.items()}
+    print(f"search   miss {result['miss']['p50_ms']:.2f} ms  hit {result['hit']['p50_ms']:.2f} ms")
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args):
+    utils.price_store = PriceStore(os.environ["PRICE_STORE_DIR"], synthetic_fetcher, stale_after=float("inf"))
+    main.http_client = httpx.AsyncClient(transport=httpx.MockTransport(fake_search))
+
+    loaded, failed = utils.warm_up_models()
+    time_steps_list = [t for t in (args.time_steps or loaded) if t in loaded]
+    if not time_steps_list:
+        raise SystemExit(f"No usable models: {failed}")
+
+    results = {"meta": {
+        "commit": git_commit(), "time": pd.Timestamp.now().isoformat(timespec="seconds"),
+        "backend": config.INFERENCE_BACKEND, "forecast_model": config.FORECAST_MODEL,
+        "python": platform.python_version(), "numpy": np.__version__, "cpus": os.cpu_count(),
+        "models": loaded, "failed_models": failed, "history_bars": HISTORY_BARS, "quick": args.quick,
+    }}
+    repeat = 1 if args.quick else args.repeat
+    transport = httpx.ASGITransport(app=main.app)
+    async with main.lifespan(main.app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            # Untimed: the benchmark ticker's bars and indicator state exist before measuring
+            await post_predict(client, {"ticker": "BENCH", "time_steps": time_steps_list[0], "predict_days": 1})
+            results["latency"] = await bench_latency(client, time_steps_list,
+                                                     PREDICT_DAYS[:3] if args.quick else PREDICT_DAYS, repeat)
+            results["indicators"] = bench_indicators(INDICATOR_BARS, max(repeat, 3))
+            results["payload"] = await bench_payload(client, time_steps_list[0])
+            results["throughput"] = await bench_throughput(client, time_steps_list[0], CONCURRENCY,
+                                                           16 if args.quick else args.requests)
+            results["search"] = await bench_search(client, [f"Q{i}" for i in range(10 if args.quick else 50)])
+    return results
+
+
+ROW_KEYS = ("time_steps", "predict_days", "bars", "period", "encoding", "concurrency")
+
+
+def flatten(value, prefix=""):
+    # Numeric leaves keyed by a readable path; list rows are keyed by their identifying fields
+    if isinstance(value, dict):
+        items = value.items()
+    elif isinstance(value, list):
+        items = ((",".join(f"{k}={row[k]}" for k in ROW_KEYS if k in row),
+                  {k: v for k, v in row.items() if k not in ROW_KEYS}) for row in value)
+    else:
+        return {prefix: value} if isinstance(value, (int, float)) and not isinstance(value, bool) else {}
+    flat = {}
+    for key, item in items:
+        flat.update(flatten(item, f"{prefix}/{key}" if prefix else str(key)))
+    return flat
+
+
+def compare(before_path, after_path):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+    print(f"{before['meta'].get('commit')} -> {after['meta'].get('commit')}")
+    old = flatten({k: v for k, v in before.items() if k != "meta"})
+    new = flatten({k: v for k, v in after.items() if k != "meta"})
+    for key in sorted(old.keys() & new.keys()):
+        if old[key] and not key.endswith("/n"):
+            print(f"{key:<70} {old[key]:>12.3f} {new[key]:>12.3f} {new[key] / old[key]:>7.2f}x")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--output", help="Write results as JSON here")
+    parser.add_argument("--time-steps", type=int, nargs="+", help="Models to measure (default: all that load)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--requests", type=int, default=64, help="Requests per throughput level")
+    parser.add_argument("--quick", action="store_true", help="One repetition, fewer horizons")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="Compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    results = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main_cli()
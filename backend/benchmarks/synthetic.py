@@ -0,0 +1,19 @@
+import numpy as np
+import pandas as pd
+
+
+def synthetic_history(bars=10000, seed=0, end="2026-10-16", start_price=50.0):
+    # Deterministic daily OHLCV frame shaped like the yfinance download
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end=end, periods=bars, name='Date')
+    close = start_price * np.exp(np.cumsum(rng.normal(0.0003, 0.018, bars)))
+    spread = np.abs(rng.normal(0, 0.01, bars))
+    open_ = close * (1 + rng.normal(0, 0.005, bars))
+    return pd.DataFrame({
+        'Open': open_,
+        'High': np.maximum(open_, close) * (1 + spread),
+        'Low': np.minimum(open_, close) * (1 - spread),
+        'Close': close,
+        'Adj Close': close,
+        'Volume': rng.integers(100_000, 10_000_000, bars).astype(np.float64),
+    }, index=index)
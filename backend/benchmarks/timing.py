@@ -0,0 +1,11 @@
+import time
+
+
+def best_of(fn, repeat):
+    # Fastest of `repeat` runs, plus the last result
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
@@ -0,0 +1,80 @@
+import os
+
+# Runtime settings, overridable through environment variables
+
+# On-disk OHLCV store used by fetch_historical_data
+PRICE_STORE_DIR = os.environ.get("PRICE_STORE_DIR", "data/prices")
+# Seconds a stored ticker is served as-is before checking upstream for new bars
+PRICE_STALE_SECONDS = float(os.environ.get("PRICE_STALE_SECONDS", 15 * 60))
+# Tickers whose bars are also kept in memory; others are read back from disk
+PRICE_STORE_MEMORY_SIZE = int(os.environ.get("PRICE_STORE_MEMORY_SIZE", 256))
+
+# Cross-request inference batching: how long the first forecast waits for
+# others on the same model, and how many windows one batch may hold
+INFERENCE_BATCH_WAIT_MS = float(os.environ.get("INFERENCE_BATCH_WAIT_MS", 5))
+INFERENCE_MAX_BATCH = int(os.environ.get("INFERENCE_MAX_BATCH", 64))
+
+# Load and trace every model at startup instead of on first request
+WARM_UP_MODELS = os.environ.get("WARM_UP_MODELS", "1") != "0"
+
+# "keras" runs the .h5 models through TensorFlow; "numpy" runs the weights
+# exported by export_models.py without importing TensorFlow
+INFERENCE_BACKEND = os.environ.get("INFERENCE_BACKEND", "keras")
+# "autoregressive" rolls the requested time_steps model forward one day at a
+# time; "direct" answers every request with the single multi-horizon model
+# from train_model.py --direct, a block of days per forward pass
+FORECAST_MODEL = os.environ.get("FORECAST_MODEL", "autoregressive")
+
+# Upstream I/O: request timeouts and how many calls to Yahoo may be in flight
+HTTP_TIMEOUT_SECONDS = float(os.environ.get("HTTP_TIMEOUT_SECONDS", 10))
+FETCH_TIMEOUT_SECONDS = float(os.environ.get("FETCH_TIMEOUT_SECONDS", 30))
+UPSTREAM_CONCURRENCY = int(os.environ.get("UPSTREAM_CONCURRENCY", 8))
+# When Yahoo rate-limits: retries per call, first pause and longest pause
+UPSTREAM_RETRIES = int(os.environ.get("UPSTREAM_RETRIES", 3))
+UPSTREAM_BACKOFF_SECONDS = float(os.environ.get("UPSTREAM_BACKOFF_SECONDS", 2))
+UPSTREAM_MAX_BACKOFF_SECONDS = float(os.environ.get("UPSTREAM_MAX_BACKOFF_SECONDS", 60))
+# Thread pools for blocking history fetches and for inference; inference
+# threads also bound how many requests can join one batch
+FETCH_WORKERS = int(os.environ.get("FETCH_WORKERS", 8))
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", 16))
+
+# Ticker search results cache
+SEARCH_CACHE_SIZE = int(os.environ.get("SEARCH_CACHE_SIZE", 2048))
+SEARCH_CACHE_TTL_SECONDS = float(os.environ.get("SEARCH_CACHE_TTL_SECONDS", 6 * 3600))
+
+# Bundled symbol listing for offline autocomplete (see symbol_index.py --refresh);
+# searches it cannot fill on its own still go upstream, and an empty value or a
+# missing file sends every search upstream
+SYMBOL_INDEX_PATH = os.environ.get("SYMBOL_INDEX_PATH", "symbols.csv")
+
+# Finished /predict responses, keyed by request and the ticker's last bar
+RESPONSE_CACHE_SIZE = int(os.environ.get("RESPONSE_CACHE_SIZE", 256))
+RESPONSE_CACHE_TTL_SECONDS = float(os.environ.get("RESPONSE_CACHE_TTL_SECONDS", 24 * 3600))
+
+# Tickers whose full-history indicator state is kept in memory; 0 computes
+# each request from a bounded warm-up window instead
+INDICATOR_CACHE_SIZE = int(os.environ.get("INDICATOR_CACHE_SIZE", 512))
+
+# Tickers whose fitted MinMax scaler is kept and extended as bars arrive; 0
+# refits over the full history on every request
+SCALER_CACHE_SIZE = int(os.environ.get("SCALER_CACHE_SIZE", 512))
+
+# Most tickers one /predict/batch call may ask for
+BATCH_MAX_TICKERS = int(os.environ.get("BATCH_MAX_TICKERS", 100))
+
+# Forecast points per event on /predict/stream
+STREAM_CHUNK_DAYS = int(os.environ.get("STREAM_CHUNK_DAYS", 5))
+
+# Forecasts precomputed by materialize.py: where they live, how long /predict
+# may serve them, how far ahead they run and how many worker processes build them
+FORECAST_STORE_DIR = os.environ.get("FORECAST_STORE_DIR", "data/forecasts")
+FORECAST_MAX_AGE_SECONDS = float(os.environ.get("FORECAST_MAX_AGE_SECONDS", 36 * 3600))
+MATERIALIZE_PREDICT_DAYS = int(os.environ.get("MATERIALIZE_PREDICT_DAYS", 120))
+MATERIALIZE_WORKERS = int(os.environ.get("MATERIALIZE_WORKERS", os.cpu_count() or 1))
+
+# Training closes and their running min/max prepared by train_model.py, reused across runs
+TRAINING_DATASET_DIR = os.environ.get("TRAINING_DATASET_DIR", "data/training")
+
+# PROFILING=1 lets /predict?profile=1 write a cProfile dump per request
+PROFILING = os.environ.get("PROFILING", "0") != "0"
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "data/profiles")
@@ -0,0 +1,60 @@
+"""Export models/model_N.h5 (and model_direct_N.h5) to NumPy weight files for INFERENCE_BACKEND=numpy.
+
+Run from backend/:  python export_models.py [--no-verify]
+
+Each export is checked against Keras on random windows unless --no-verify is
+given; a model Keras cannot load is exported but reported as unverified.
+"""
+import argparse
+import os
+import re
+import sys
+import numpy as np
+from numpy_lstm import NumpyLSTM
+
+TOLERANCE = 1e-4
+
+
+def keras_outputs(model_path, windows):
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+    from tensorflow.keras.models import load_model
+    return load_model(model_path).predict(windows, verbose=0)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--models-dir", default="models")
+    parser.add_argument("--no-verify", action="store_true")
+    args = parser.parse_args()
+
+    failures = 0
+    for name in sorted(os.listdir(args.models_dir)):
+        match = re.fullmatch(r"model_(?:direct_)?(\d+)\.h5", name)
+        if not match:
+            continue
+        time_steps = int(match.group(1))
+        h5_path = os.path.join(args.models_dir, name)
+        npz_path = os.path.join(args.models_dir, name[:-len(".h5")] + ".npz")
+
+        model = NumpyLSTM.from_h5(h5_path)
+        model.save_npz(npz_path)
+        print(f"Exported {h5_path} -> {npz_path}")
+
+        if args.no_verify:
+            continue
+        windows = np.random.default_rng(time_steps).random((16, time_steps, 1), dtype=np.float32)
+        try:
+            expected = keras_outputs(h5_path, windows)
+        except Exception as e:
+            print(f"  not verified, Keras could not load it: {e}")
+            continue
+        diff = float(np.abs(NumpyLSTM.from_npz(npz_path).predict(windows) - expected).max())
+        status = "ok" if diff <= TOLERANCE else "MISMATCH"
+        failures += status != "ok"
+        print(f"  max abs diff vs Keras: {diff:.2e} {status}")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
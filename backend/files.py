@@ -0,0 +1,6 @@
+import re
+
+
+def safe_filename(name):
+    # Tickers and profile names as file names: anything but [A-Za-z0-9._-] becomes "_"
+    return re.sub(r"[^A-Za-z0-9._-]", "_", name)
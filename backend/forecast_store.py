@@ -0,0 +1,93 @@
+import os
+import threading
+import time
+import numpy as np
+
+import config
+from files import safe_filename
+from indicators import flatten_indicators, unflatten_indicators
+from response_cache import bar_signature
+
+INDICATOR_KEYS = ['rsi', 'macd', 'signal', 'histogram', 'sma50', 'ema200']
+
+
+class ForecastStore:
+    """Precomputed forecasts and full-history indicators, one .npz file per ticker.
+
+    Written by materialize.py. An entry is only served for the exact bars it was
+    built on (same bar signature as response_cache), by the model the server
+    would run now (utils.model_signature) and while younger than max_age; a
+    longer forecast also answers every shorter predict_days, since the rollout
+    is autoregressive.
+    """
+
+    def __init__(self, root=None, max_age=None):
+        self.root = root or config.FORECAST_STORE_DIR
+        self.max_age = config.FORECAST_MAX_AGE_SECONDS if max_age is None else max_age
+        self.hits = 0
+        self.misses = 0
+        self._memory = {}  # ticker -> (entry, file mtime)
+        self._lock = threading.Lock()
+
+    def path(self, ticker):
+        return os.path.join(self.root, f"{safe_filename(ticker.upper())}.npz")
+
+    def lookup(self, ticker, data, time_steps, predict_days, model):
+        # (forecast[:predict_days], full-history indicators), or None when stale
+        # or built with another model than `model`
+        entry = self._entry(ticker.upper())
+        forecast = None if entry is None else entry['forecasts'].get(time_steps)
+        if (forecast is None or len(forecast) < predict_days
+                or model is None or entry['models'].get(time_steps) != model
+                or entry['signature'] != bar_signature(data)
+                or time.time() - entry['created'] > self.max_age):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return forecast[:max(predict_days, 0)], entry['indicators']
+
+    def write(self, ticker, data, forecasts, indicators, models):
+        # forecasts: {time_steps: unscaled forecast}; indicators: compute_indicators(data['Close']);
+        # models: {time_steps: utils.model_signature(time_steps)} at the time of the rollout
+        os.makedirs(self.root, exist_ok=True)
+        path = self.path(ticker)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        arrays = {f"forecast_{time_steps}": np.asarray(values) for time_steps, values in forecasts.items()}
+        arrays.update((f"model_{time_steps}", np.array(models[time_steps])) for time_steps in forecasts)
+        arrays.update(zip(INDICATOR_KEYS, flatten_indicators(indicators)))
+        arrays['signature'] = np.array(bar_signature(data))
+        arrays['created'] = np.float64(time.time())
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+    def _entry(self, ticker):
+        path = self.path(ticker)
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return None
+        with self._lock:
+            cached = self._memory.get(ticker)
+            if cached is not None and cached[1] == mtime:
+                return cached[0]
+        try:
+            with np.load(path) as stored:
+                entry = {
+                    'signature': str(stored['signature']),
+                    'created': float(stored['created']),
+                    'forecasts': {int(name[len("forecast_"):]): stored[name]
+                                  for name in stored.files if name.startswith("forecast_")},
+                    'models': {int(name[len("model_"):]): str(stored[name])
+                               for name in stored.files if name.startswith("model_")},
+                    'indicators': unflatten_indicators([stored[key] for key in INDICATOR_KEYS]),
+                }
+        except Exception as e:
+            print(f"Ignoring unreadable forecast file {path}: {e}")
+            return None
+        with self._lock:
+            self._memory[ticker] = (entry, mtime)
+        return entry
+
+    def stats(self):
+        return {"size": len(self._memory), "hits": self.hits, "misses": self.misses}
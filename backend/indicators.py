@@ -0,0 +1,166 @@
+from collections import deque
+import numpy as np
+import pandas as pd
+
+from ticker_state import CommittedBars, TickerStateCache
+
+
+def calculate_rsi(series, period=14):
+    delta = series.diff(1)
+    gain = delta.where(delta > 0, 0)
+    loss = -delta.where(delta < 0, 0)
+    avg_gain = gain.rolling(window=period, min_periods=1).mean()
+    avg_loss = loss.rolling(window=period, min_periods=1).mean()
+    rs = avg_gain / avg_loss
+    rsi = 100 - (100 / (1 + rs))
+    return rsi
+
+def calculate_macd(series, fast=12, slow=26, signal=9):
+    ema_fast = series.ewm(span=fast, adjust=False).mean()
+    ema_slow = series.ewm(span=slow, adjust=False).mean()
+    macd_line = ema_fast - ema_slow
+    signal_line = macd_line.ewm(span=signal, adjust=False).mean()
+    histogram = macd_line - signal_line
+    return {
+        'macd': macd_line,
+        'signal': signal_line,
+        'histogram': histogram
+    }
+
+def calculate_sma(series, period=50):
+    return series.rolling(window=period).mean()
+
+def calculate_ema(series, period=200):
+    return series.ewm(span=period, adjust=False).mean()
+
+def compute_indicators(close):
+    # All chart indicators for a Close series, as numpy arrays
+    macd = calculate_macd(close)
+    return {
+        'rsi': calculate_rsi(close).to_numpy(),
+        'macd': {key: value.to_numpy() for key, value in macd.items()},
+        'sma50': calculate_sma(close, 50).to_numpy(),
+        'ema200': calculate_ema(close, 200).to_numpy(),
+    }
+
+# Bars before a window needed for its indicators to be settled. SMA50 and RSI14
+# only look back 49 and 14 bars; the EMAs never fully forget their seed, but
+# after 1000 bars its weight in EMA200 is (1 - 2/201) ** 1000, about 5e-5.
+INDICATOR_LOOKBACK = 1000
+
+def compute_window_indicators(close, start, lookback=INDICATOR_LOOKBACK):
+    # Indicators for close[start:], computed from a bounded warm-up before start
+    begin = max(0, start - lookback)
+    return slice_indicators(compute_indicators(close.iloc[begin:]), start - begin)
+
+def slice_indicators(indicators, start):
+    return {
+        'rsi': indicators['rsi'][start:],
+        'macd': {key: value[start:] for key, value in indicators['macd'].items()},
+        'sma50': indicators['sma50'][start:],
+        'ema200': indicators['ema200'][start:],
+    }
+
+
+RSI_PERIOD, MACD_FAST, MACD_SLOW, MACD_SIGNAL, SMA_PERIOD, EMA_PERIOD = 14, 12, 26, 9, 50, 200
+
+
+def _ewm_step(y, x, span):
+    # One step of pandas' ewm(span, adjust=False).mean(), in the same float order
+    if y == x:
+        return y
+    alpha = 1. / (1. + (span - 1) / 2.)
+    return ((1. - alpha) * y + alpha * x) / ((1. - alpha) + alpha)
+
+
+class _RollingState:
+    """Indicator state after a prefix of a Close series, advanced one bar at a time.
+
+    The update rules mirror the pandas functions above: EMAs follow pandas'
+    adjust=False recurrence and the rolling means average the last window values.
+    """
+
+    def __init__(self, close, outputs, end):
+        # Seed from the pandas outputs at bar end - 1
+        last = end - 1
+        self.close = close[last]
+        self.ema_fast = pd.Series(close[:end]).ewm(span=MACD_FAST, adjust=False).mean().iloc[-1]
+        self.ema_slow = pd.Series(close[:end]).ewm(span=MACD_SLOW, adjust=False).mean().iloc[-1]
+        self.signal = outputs['macd']['signal'][last]
+        self.ema = outputs['ema200'][last]
+        delta = np.diff(close[max(0, end - RSI_PERIOD - 1):end])
+        if end <= RSI_PERIOD:
+            delta = np.concatenate([[0.0], delta])  # pandas counts the first bar as a zero move
+        self.gains = deque(np.where(delta > 0, delta, 0.0), maxlen=RSI_PERIOD)
+        self.losses = deque(np.where(delta < 0, -delta, 0.0), maxlen=RSI_PERIOD)
+        self.window = deque(close[max(0, end - SMA_PERIOD):end], maxlen=SMA_PERIOD)
+
+    def step(self, x, commit=True):
+        # Indicator values for the next bar; commit=False leaves the state untouched
+        ema_fast = _ewm_step(self.ema_fast, x, MACD_FAST)
+        ema_slow = _ewm_step(self.ema_slow, x, MACD_SLOW)
+        macd = ema_fast - ema_slow
+        signal = _ewm_step(self.signal, macd, MACD_SIGNAL)
+        ema = _ewm_step(self.ema, x, EMA_PERIOD)
+
+        delta = x - self.close
+        gains, losses, window = self.gains, self.losses, self.window
+        if not commit:
+            gains, losses, window = deque(gains, RSI_PERIOD), deque(losses, RSI_PERIOD), deque(window, SMA_PERIOD)
+        gains.append(delta if delta > 0 else 0.0)
+        losses.append(-delta if delta < 0 else 0.0)
+        window.append(x)
+        avg_gain, avg_loss = sum(gains) / len(gains), sum(losses) / len(losses)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = 100 - 100 / (1 + np.float64(avg_gain) / avg_loss)
+        sma = sum(window) / SMA_PERIOD if len(window) == SMA_PERIOD else np.nan
+
+        if commit:
+            self.close, self.ema_fast, self.ema_slow, self.signal, self.ema = x, ema_fast, ema_slow, signal, ema
+        return rsi, macd, signal, macd - signal, sma, ema
+
+
+class _TickerIndicators(CommittedBars):
+    def __init__(self, dates, close):
+        # The uncommitted last bar is recomputed on every call
+        super().__init__(dates, close)
+        outputs = compute_indicators(pd.Series(close))
+        self.columns = flatten_indicators(outputs)
+        self.state = _RollingState(close, outputs, self.committed)
+
+    def update(self, dates, close):
+        n = self.committed
+        new_rows = [self.state.step(x) for x in close[n:-1]]
+        tail = self.state.step(close[-1], commit=False)
+        committed = [column[:n] for column in self.columns]
+        if new_rows:
+            committed = [np.concatenate([column, values]) for column, values in zip(committed, zip(*new_rows))]
+        self.commit(dates, close)
+        self.columns = [np.append(column, value) for column, value in zip(committed, tail)]
+
+
+def flatten_indicators(outputs):
+    macd = outputs['macd']
+    return [outputs['rsi'], macd['macd'], macd['signal'], macd['histogram'], outputs['sma50'], outputs['ema200']]
+
+
+def unflatten_indicators(columns):
+    rsi, macd, signal, histogram, sma50, ema200 = columns
+    return {'rsi': rsi, 'macd': {'macd': macd, 'signal': signal, 'histogram': histogram},
+            'sma50': sma50, 'ema200': ema200}
+
+
+class IndicatorEngine(TickerStateCache):
+    """Full-history indicators per ticker, extended incrementally as bars arrive.
+
+    The first call for a ticker computes everything with the pandas functions;
+    later calls only step the stored EMA values and rolling windows over the
+    new bars.
+    """
+
+    state_class = _TickerIndicators
+
+    def compute(self, ticker, close):
+        if len(close) < 2:
+            return compute_indicators(close)
+        return self.apply(ticker, close, lambda state: unflatten_indicators(state.columns))
@@ -1,15 +1,81 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import os
+import threading
+import time
+from fastapi import FastAPI, Header, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List
 import uvicorn
 import pandas as pd
 import numpy as np
-from utils import fetch_historical_data, prepare_data_for_prediction, make_prediction
+from utils import fetch_historical_data, prepare_data_for_prediction, make_prediction, make_batch_prediction, iter_prediction, scheduler, warm_up_models, fetches, scaler_cache, model_signature
+import config
+import metrics
+import upstream
+from indicators import IndicatorEngine, compute_window_indicators, slice_indicators
+from forecast_store import ForecastStore
+from response_cache import ResponseCache
+from serialization import COMPACT_MEDIA_TYPE, compact_payload, downsample, dumps, format_dates, json_payload
+from search_cache import SearchCache
+from symbol_index import SymbolIndex
 from datetime import datetime
 import dateutil.relativedelta
-import requests  # Add this import
+import httpx
 
-app = FastAPI()
+SEARCH_URL = "https://query1.finance.yahoo.com/v1/finance/search"
+SEARCH_QUOTES_COUNT = 15
+SEARCH_LIMIT = 10  # Suggestions per /search_ticker response
+
+# Blocking upstream fetches (yfinance) and CPU-bound inference get their own
+# pools so neither starves the other or the event loop
+fetch_executor = ThreadPoolExecutor(max_workers=config.FETCH_WORKERS, thread_name_prefix="fetch")
+inference_executor = ThreadPoolExecutor(max_workers=config.INFERENCE_WORKERS, thread_name_prefix="inference")
+upstream_limit = asyncio.Semaphore(config.UPSTREAM_CONCURRENCY)
+http_client = None  # Shared connection pool, opened in lifespan
+
+def get_http_client():
+    global http_client
+    if http_client is None:
+        http_client = httpx.AsyncClient(
+            headers={'User-Agent': 'Mozilla/5.0'},  # To mimic a browser and avoid blocks
+            timeout=config.HTTP_TIMEOUT_SECONDS,
+            limits=httpx.Limits(max_connections=config.UPSTREAM_CONCURRENCY, max_keepalive_connections=config.UPSTREAM_CONCURRENCY),
+        )
+    return http_client
+
+async def run_in(executor, fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+# Full-history indicators per ticker, updated as new bars arrive
+indicator_engine = IndicatorEngine(maxsize=config.INDICATOR_CACHE_SIZE)
+# Finished /predict responses, valid until the ticker's last bar changes
+response_cache = ResponseCache(maxsize=config.RESPONSE_CACHE_SIZE, ttl=config.RESPONSE_CACHE_TTL_SECONDS)
+# Forecasts written by the nightly materialize.py run
+forecast_store = ForecastStore()
+
+readiness = {"ready": False, "models": [], "failed": {}}
+
+def warm_up():
+    loaded, failed = warm_up_models()
+    readiness.update(ready=len(loaded) > 0, models=loaded, failed=failed)
+    print(f"Models ready: {loaded}" + (f", failed: {list(failed)}" if failed else ""))
+
+@asynccontextmanager
+async def lifespan(app):
+    # Load and trace the models in the background; /ready reports 503 until done
+    if config.WARM_UP_MODELS:
+        threading.Thread(target=warm_up, daemon=True).start()
+    else:
+        readiness["ready"] = True
+    get_http_client()
+    yield
+    await http_client.aclose()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,96 +85,294 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_latency(request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    # Label by route template, not raw path, to keep the series count bounded
+    route = request.scope.get("route")
+    metrics.REQUEST_SECONDS.observe(time.perf_counter() - start, request.method,
+                                    route.path if route is not None else "unmatched", response.status_code)
+    return response
+
 class PredictionRequest(BaseModel):
     ticker: str
     period: str = "1y"
     time_steps: int = 60
     predict_days: int = 30
 
-def calculate_rsi(series, period=14):
-    delta = series.diff(1)
-    gain = delta.where(delta > 0, 0)
-    loss = -delta.where(delta < 0, 0)
-    avg_gain = gain.rolling(window=period, min_periods=1).mean()
-    avg_loss = loss.rolling(window=period, min_periods=1).mean()
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
-
-def calculate_macd(series, fast=12, slow=26, signal=9):
-    ema_fast = series.ewm(span=fast, adjust=False).mean()
-    ema_slow = series.ewm(span=slow, adjust=False).mean()
-    macd_line = ema_fast - ema_slow
-    signal_line = macd_line.ewm(span=signal, adjust=False).mean()
-    histogram = macd_line - signal_line
-    return {
-        'macd': macd_line,
-        'signal': signal_line,
-        'histogram': histogram
-    }
-
-def calculate_sma(series, period=50):
-    return series.rolling(window=period).mean()
+class BatchPredictionRequest(BaseModel):
+    tickers: List[str] = Field(..., min_length=1, max_length=config.BATCH_MAX_TICKERS)
+    period: str = "1y"
+    time_steps: List[int] = [60]
+    predict_days: int = 30
 
-def calculate_ema(series, period=200):
-    return series.ewm(span=period, adjust=False).mean()
+async def fetch_history(ticker):
+    try:
+        # Not under upstream_limit: most fetches are price store hits, and the
+        # store's upstream calls are bounded by upstream.limiter
+        with metrics.span("fetch"):
+            return await asyncio.wait_for(
+                run_in(fetch_executor, fetch_historical_data, ticker, "max"),
+                timeout=config.FETCH_TIMEOUT_SECONDS,
+            )
+    except asyncio.TimeoutError:
+        return None
 
-def replace_nan_with_none(lst):
-    return [None if pd.isna(x) else x for x in lst]
+async def fetch_search_results(query):
+    params = {"q": query, "quotesCount": SEARCH_QUOTES_COUNT, "newsCount": 0}
+    async with upstream_limit:
+        response = await get_http_client().get(SEARCH_URL, params=params)
+    response.raise_for_status()
+    data = response.json()
+    
+    # Extract and filter quotes (only EQUITY types for stocks)
+    quotes = data.get('quotes', [])
+    filtered_results = [
+        {
+            "ticker": quote['symbol'],
+            "name": quote.get('longname') or quote.get('shortname') or quote['symbol'],
+            "exchange": quote.get('exchange'),
+            "type": quote['quoteType']
+        }
+        for quote in quotes if quote.get('quoteType') == 'EQUITY'  # Filter to stocks only
+    ]
+    # Fewer quotes than asked for means upstream had nothing more to give
+    return filtered_results, len(quotes) < SEARCH_QUOTES_COUNT
 
-def replace_nan_in_indicators(indicators_data):
-    for key, value in indicators_data.items():
-        if isinstance(value, dict):
-            for subkey, subvalue in value.items():
-                value[subkey] = replace_nan_with_none(subvalue)
-        else:
-            indicators_data[key] = replace_nan_with_none(value)
-    return indicators_data
+search_cache = SearchCache(fetch_search_results, maxsize=config.SEARCH_CACHE_SIZE, ttl=config.SEARCH_CACHE_TTL_SECONDS)
+# Local listing answers autocomplete directly; Yahoo is only asked on a miss
+symbol_index = SymbolIndex.load(config.SYMBOL_INDEX_PATH) if os.path.exists(config.SYMBOL_INDEX_PATH) else None
 
 @app.get("/search_ticker")
-def search_ticker(query: str):
+async def search_ticker(query: str):
     if not query:
         return {"results": []}
     
+    # The local index answers alone only when it fills the list (a full
+    # listing from symbol_index.py --refresh); otherwise its matches lead and
+    # the cached upstream search fills the rest
+    local_results = symbol_index.search(query, limit=SEARCH_LIMIT) if symbol_index is not None else []
+    if len(local_results) >= SEARCH_LIMIT:
+        return {"results": local_results}
+
     try:
-        url = f"https://query1.finance.yahoo.com/v1/finance/search?q={query}&quotesCount=15&newsCount=0"
-        headers = {'User-Agent': 'Mozilla/5.0'}  # To mimic a browser and avoid blocks
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        data = response.json()
-        
-        # Extract and filter quotes (only EQUITY types for stocks)
-        quotes = data.get('quotes', [])
-        filtered_results = [
-            {
-                "ticker": quote['symbol'],
-                "name": quote.get('longname') or quote.get('shortname') or quote['symbol'],
-                "exchange": quote.get('exchange'),
-                "type": quote['quoteType']
-            }
-            for quote in quotes if quote.get('quoteType') == 'EQUITY'  # Filter to stocks only
-        ]
-        
-        return {"results": filtered_results[:10]}  # Limit to 10 results
+        filtered_results = await search_cache.search(query)
     except Exception as e:
         print(f"Search error: {e}")
+        if local_results:
+            return {"results": local_results}
         return {"results": [], "error": "Failed to fetch suggestions"}
+    seen = {result["ticker"] for result in local_results}
+    merged = local_results + [result for result in filtered_results if result["ticker"] not in seen]
+    return {"results": merged[:SEARCH_LIMIT]}
+
+@app.get("/cache/stats")
+def cache_stats():
+    stats = {"search": search_cache.stats(), "predict": response_cache.stats(), "indicators": indicator_engine.stats(),
+             "materialized": forecast_store.stats(), "fetches": dict(fetches.stats),
+             "scalers": scaler_cache.stats()}
+    if symbol_index is not None:
+        stats["symbol_index"] = {"size": len(symbol_index), "hits": symbol_index.hits, "misses": symbol_index.misses}
+    return stats
     
+@app.get("/metrics")
+def metrics_endpoint():
+    # Prometheus text format: request and stage latency histograms, model and
+    # price store counters, plus the /cache/stats numbers as gauges
+    caches = {(cache, stat): value for cache, stats in cache_stats().items() for stat, value in stats.items()
+              if isinstance(value, (int, float)) and not isinstance(value, bool)}
+    gauges = {
+        "stockpredictor_cache": ("Cache sizes and hit counters, as in /cache/stats", ("cache", "stat"), caches),
+        "stockpredictor_scheduler": ("Inference scheduler totals", ("stat",),
+                                     {(stat,): value for stat, value in scheduler.stats.items()}),
+        "stockpredictor_upstream": ("Upstream history calls and rate limits", ("stat",),
+                                    {(stat,): value for stat, value in upstream.limiter.stats.items()}),
+        "stockpredictor_ready": ("1 once the models are warmed up", (), {(): int(readiness["ready"])}),
+    }
+    return PlainTextResponse(metrics.render(gauges), media_type="text/plain; version=0.0.4")
+
+@app.get("/health")
+def health():
+    return {"status": "ok"}
+
+@app.get("/ready")
+def ready():
+    status_code = 200 if readiness["ready"] else 503
+    return JSONResponse(status_code=status_code, content=readiness)
+
 def read_root():
     return {"message": "Stock Prediction API is running"}
 
 @app.post("/predict")
-def predict(request: PredictionRequest):
+async def predict(
+    request: PredictionRequest,
+    output_format: str = Query(None, alias="format"),
+    max_points: int = Query(None, ge=3),
+    accept: str = Header(None),
+    if_none_match: str = Header(None),
+    profile: bool = Query(False),
+):
     
     ticker = request.ticker.upper()
-    time_steps = request.time_steps
-    predict_days = request.predict_days
-
-    full_historical = fetch_historical_data(ticker, period="max")
+    fetch_start = time.perf_counter()
+    full_historical = await fetch_history(ticker)
+    fetch_seconds = time.perf_counter() - fetch_start
 
     if full_historical is None:
         return {"error": f"Could not fetch data for {ticker}"}
-    
+
+    # Compact encoding via ?format=compact or the compact media type in Accept
+    compact = output_format == "compact" or (accept is not None and COMPACT_MEDIA_TYPE in accept)
+    media_type = COMPACT_MEDIA_TYPE if compact else "application/json"
+
+    # ?profile=1 (only with PROFILING=1) bypasses the caches, writes a cProfile
+    # dump of the render and reports stage timings in Server-Timing
+    if profile and config.PROFILING:
+        (body, _), path, timings = await run_in(inference_executor, metrics.profile_call, ticker,
+                                                 render_prediction, request, full_historical, compact, max_points)
+        headers = {"Cache-Control": "no-store", "X-Profile": path,
+                   "Server-Timing": metrics.server_timing({"fetch": fetch_seconds, **timings})}
+        return Response(content=body, media_type=media_type, headers=headers)
+
+    params = (request.period, request.time_steps, request.predict_days, compact, max_points)
+    etag = response_cache.key(ticker, params, full_historical)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept"}  # Revalidate with If-None-Match
+
+    # Only cached (i.e. successful) renders are revalidated; a failed one is
+    # rendered again and sent without an ETag
+    body = response_cache.get(etag)
+    if body is not None and if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    if body is None:
+        body, failed = await run_in(inference_executor, render_prediction, request, full_historical, compact, max_points)
+        if failed:
+            headers = {"Cache-Control": "no-store", "Vary": "Accept"}
+        else:
+            response_cache.set(ticker, etag, body)
+    # Already JSON: skip FastAPI's re-encoding of the arrays
+    return Response(content=body, media_type=media_type, headers=headers)
+
+@app.post("/predict/stream")
+async def predict_stream(
+    request: PredictionRequest,
+    output_format: str = Query(None, alias="format"),
+    accept: str = Header(None),
+):
+    # Progressive /predict: a "history" event with historical data and
+    # indicators as soon as the bars are in, then "forecast" events of up to
+    # STREAM_CHUNK_DAYS points each, then "done" (or "error"). NDJSON by
+    # default; Server-Sent Events via ?format=sse or Accept: text/event-stream.
+    ticker = request.ticker.upper()
+    sse = output_format == "sse" or (accept is not None and "text/event-stream" in accept)
+
+    def event(name, payload):
+        if sse:
+            return b"event: " + name.encode() + b"\ndata: " + dumps(payload) + b"\n\n"
+        return dumps({"event": name, **payload}) + b"\n"
+
+    async def events():
+        full_historical = await fetch_history(ticker)
+        if full_historical is None:
+            yield event("error", {"error": f"Could not fetch data for {ticker}"})
+            return
+
+        history = await run_in(inference_executor, build_prediction, request, full_historical, (np.array([]), None))
+        payload = json_payload(history)
+        yield event("history", {"historical": payload["historical"], "indicators": payload["indicators"]})
+
+        try:
+            input_data, scaler = await run_in(inference_executor, prepare_data_for_prediction, full_historical, request.time_steps, request.ticker)
+        except Exception as e:
+            yield event("error", {"error": str(e)})
+            return
+        predicted_dates = pd.bdate_range(start=full_historical.index[-1] + pd.Timedelta(days=1), periods=max(request.predict_days, 0))
+        chunks = iter_prediction(input_data, scaler, request.predict_days, request.time_steps, config.STREAM_CHUNK_DAYS)
+        done = 0
+        while True:
+            try:
+                prices = await run_in(inference_executor, next, chunks, None)
+            except Exception as e:
+                print(f"Prediction error: {e}")
+                yield event("error", {"error": str(e)})
+                return
+            if prices is None:
+                break
+            dates = predicted_dates[done:done + len(prices)]
+            done += len(prices)
+            yield event("forecast", {"dates": format_dates(dates), "prices": prices})
+        yield event("done", {"predict_days": done})
+
+    media_type = "text/event-stream" if sse else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+@app.post("/predict/batch")
+async def predict_batch(request: BatchPredictionRequest):
+    # Streams one NDJSON line per ticker and time_steps, each shaped like a
+    # /predict response plus "ticker" and "time_steps"
+    tickers = list(dict.fromkeys(ticker.upper() for ticker in request.tickers))
+
+    async def fetch(ticker):
+        return ticker, await fetch_history(ticker)
+
+    async def lines():
+        histories = {}
+        for done in asyncio.as_completed([fetch(ticker) for ticker in tickers]):
+            ticker, full_historical = await done
+            if full_historical is None:
+                yield dumps({"ticker": ticker, "error": f"Could not fetch data for {ticker}"}) + b"\n"
+            else:
+                histories[ticker] = full_historical
+        for time_steps in dict.fromkeys(request.time_steps):
+            for line in await run_in(inference_executor, render_batch, request, histories, time_steps):
+                yield line
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+def render_batch(request, histories, time_steps):
+    # Every ticker's window is scaled with its own scaler, then all of them
+    # go through one batched rollout of the time_steps model
+    inputs, scalers, forecasts = {}, {}, {}
+    for ticker, full_historical in histories.items():
+        try:
+            inputs[ticker], scalers[ticker] = prepare_data_for_prediction(full_historical, time_steps, ticker)
+        except Exception as e:
+            forecasts[ticker] = (np.array([]), str(e))
+    if inputs:
+        try:
+            predictions = make_batch_prediction(list(inputs.values()), list(scalers.values()), request.predict_days, time_steps)
+            forecasts.update((ticker, (preds, None)) for ticker, preds in zip(inputs, predictions))
+        except Exception as e:
+            print(f"Batch prediction error: {e}")
+            forecasts.update((ticker, (np.array([]), str(e))) for ticker in inputs)
+
+    lines = []
+    for ticker, full_historical in histories.items():
+        single = PredictionRequest(ticker=ticker, period=request.period, time_steps=time_steps, predict_days=request.predict_days)
+        payload = json_payload(build_prediction(single, full_historical, forecasts[ticker]))
+        lines.append(dumps({"ticker": ticker, "time_steps": time_steps, **payload}) + b"\n")
+    return lines
+
+def render_prediction(request, full_historical, compact=False, max_points=None):
+    # Serve the materialized forecast when it was built on these exact bars by the current model
+    materialized = forecast_store.lookup(request.ticker, full_historical, request.time_steps, request.predict_days,
+                                         model_signature(request.time_steps))
+    if materialized is not None:
+        predictions, indicators = materialized
+        result = build_prediction(request, full_historical, (predictions, None), indicators)
+    else:
+        result = build_prediction(request, full_historical)
+    with metrics.span("serialize"):
+        if max_points:
+            result = downsample(result, max_points)
+        payload = compact_payload(result) if compact else json_payload(result)
+        body = dumps(payload)
+    return body, "error" in result
+
+def build_prediction(request, full_historical, forecast=None, indicators=None):
+    time_steps = request.time_steps
+    predict_days = request.predict_days
+
     last_date = full_historical.index[-1]
     if request.period in ["all", "max"]:
         historical_data = full_historical
@@ -129,50 +393,51 @@ def predict(request: PredictionRequest):
         start_date = last_date - dateutil.relativedelta.relativedelta(**offset)
         historical_data = full_historical[full_historical.index >= start_date]
     
-    # Format historical
+    # Format historical; series stay numpy arrays until serialization
     historical = {
-        "dates": historical_data.index.strftime("%Y-%m-%d").tolist(),
-        "prices": historical_data['Close'].values.tolist()
+        "dates": historical_data.index.values,
+        "prices": historical_data['Close'].to_numpy()
     }
 
     error_msg = None
-    predictions = []
-    try:
-        input_data, scaler = prepare_data_for_prediction(full_historical, time_steps)
-        preds_array = make_prediction(input_data, scaler, predict_days, time_steps)
-        predictions = preds_array.tolist()
-    except Exception as e:
-        print(f"Prediction error: {e}")
-        error_msg = str(e)
+    predictions = np.array([])
+    if forecast is not None:
+        predictions, error_msg = forecast  # Already computed, e.g. by /predict/batch
+    else:
+        try:
+            with metrics.span("prepare"):
+                input_data, scaler = prepare_data_for_prediction(full_historical, time_steps, request.ticker)
+            with metrics.span("inference"):
+                predictions = make_prediction(input_data, scaler, predict_days, time_steps)
+        except Exception as e:
+            print(f"Prediction error: {e}")
+            error_msg = str(e)
 
     # Predicted dates using business days
-    predicted_dates = pd.bdate_range(start=last_date + pd.Timedelta(days=1), periods=len(predictions)).strftime("%Y-%m-%d").tolist() if len(predictions) > 0 else []
+    predicted_dates = pd.bdate_range(start=last_date + pd.Timedelta(days=1), periods=len(predictions)).values
     predicted = {
         "dates": predicted_dates,
         "prices": predictions
     }
 
-    # Always compute all indicators
-    indicators_data = {}
-    df = historical_data.copy()
-    close = df['Close']
-    indicators_data['rsi'] = calculate_rsi(close).tolist()
-    macd = calculate_macd(close)
-    indicators_data['macd'] = {
-        'macd': macd['macd'].tolist(),
-        'signal': macd['signal'].tolist(),
-        'histogram': macd['histogram'].tolist()
-    }
-    indicators_data['sma50'] = calculate_sma(close, 50).tolist()
-    indicators_data['ema200'] = calculate_ema(close, 200).tolist()
-
-    # Replace NaN with None for JSON compatibility
-    indicators_data = replace_nan_in_indicators(indicators_data)
+    # Always compute all indicators over the full fetched history (incrementally,
+    # or from a bounded warm-up window when the engine is off), then keep the
+    # displayed range so early values are settled instead of NaN-heavy
+    start = len(full_historical) - len(historical_data)
+    with metrics.span("indicators"):
+        if indicators is not None:
+            indicators = slice_indicators(indicators, start)  # Precomputed over the full history
+        elif config.INDICATOR_CACHE_SIZE > 0:
+            indicators = indicator_engine.compute(request.ticker.upper(), full_historical['Close'])
+            indicators = slice_indicators(indicators, start)
+        else:
+            indicators = compute_window_indicators(full_historical['Close'], start)
 
+    # NaN becomes null when the response is serialized
     response = {
         "historical": historical,
         "predicted": predicted,
-        "indicators": indicators_data
+        "indicators": indicators
     }
     if error_msg:
         response["error"] = error_msg
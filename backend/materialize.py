@@ -0,0 +1,120 @@
+"""Nightly forecast materialization for a ticker universe.
+
+Refreshes every ticker's history, then runs each model over the universe in
+batched rollouts across a process pool, and writes forecasts plus indicators
+to the forecast store that /predict serves while they match the latest bars.
+
+Run from backend/ after the market close, e.g. from cron:
+    30 22 * * 1-5  cd /srv/app/backend && python materialize.py
+    python materialize.py --tickers AAPL MSFT NVDA --workers 2
+"""
+import argparse
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import config
+import utils
+from forecast_store import ForecastStore
+from indicators import compute_indicators
+from pool import process_pool
+from price_store import PriceStore
+from symbol_index import SymbolIndex
+
+
+def load_universe(path):
+    return [row["ticker"] for row in SymbolIndex.load(path).rows]
+
+
+def refresh_histories(tickers, workers, price_root=None):
+    # stale_after=0: always check upstream for the day's bars
+    store = PriceStore(price_root, stale_after=0)
+
+    def refresh(ticker):
+        try:
+            return store.get(ticker)
+        except Exception as e:
+            print(f"Refresh failed for {ticker}: {e}")
+            return None
+
+    with ThreadPoolExecutor(workers) as pool:
+        frames = pool.map(refresh, tickers)
+    return [ticker for ticker, frame in zip(tickers, frames) if frame is not None]
+
+
+def materialize_chunk(tickers, time_steps_list, predict_days, price_root=None, forecast_root=None):
+    # Runs in a worker process. Reads the bars refresh_histories just stored,
+    # then rolls out every ticker's window for one model in a single batch.
+    prices = PriceStore(price_root, stale_after=float("inf"))
+    frames = {ticker: prices.get(ticker) for ticker in tickers}
+    frames = {ticker: frame for ticker, frame in frames.items() if frame is not None}
+    forecasts = {ticker: {} for ticker in frames}
+    models = {}  # time_steps -> utils.model_signature, recorded with every forecast
+    for time_steps in time_steps_list:
+        inputs, scalers = {}, {}
+        for ticker, frame in frames.items():
+            try:
+                inputs[ticker], scalers[ticker] = utils.prepare_data_for_prediction(frame, time_steps, ticker)
+            except ValueError:
+                continue  # Not enough history for this model
+        if not inputs:
+            continue
+        try:
+            predictions = utils.make_batch_prediction(list(inputs.values()), list(scalers.values()),
+                                                      predict_days, time_steps)
+        except Exception as e:
+            print(f"Rollout failed for time_steps={time_steps}: {e}")
+            continue
+        models[time_steps] = utils.model_signature(time_steps)
+        for ticker, values in zip(inputs, predictions):
+            forecasts[ticker][time_steps] = values
+
+    store = ForecastStore(forecast_root)
+    written = 0
+    for ticker, frame in frames.items():
+        if forecasts[ticker]:
+            store.write(ticker, frame, forecasts[ticker], compute_indicators(frame['Close']), models)
+            written += 1
+    return written
+
+
+def materialize(tickers, time_steps_list, predict_days, workers, chunk_size, price_root=None, forecast_root=None):
+    chunks = [tickers[i:i + chunk_size] for i in range(0, len(tickers), chunk_size)]
+    written = 0
+    with process_pool(workers) as pool:
+        futures = [pool.submit(materialize_chunk, chunk, time_steps_list, predict_days, price_root, forecast_root)
+                   for chunk in chunks]
+        for future in as_completed(futures):
+            written += future.result()
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--universe", default=config.SYMBOL_INDEX_PATH, help="Symbol listing CSV to materialize")
+    parser.add_argument("--tickers", nargs="+", help="Explicit tickers instead of the universe file")
+    parser.add_argument("--time-steps", type=int, nargs="+", help="Models to run (default: all available)")
+    parser.add_argument("--predict-days", type=int, default=config.MATERIALIZE_PREDICT_DAYS)
+    parser.add_argument("--workers", type=int, default=config.MATERIALIZE_WORKERS)
+    parser.add_argument("--chunk-size", type=int, default=config.INFERENCE_MAX_BATCH,
+                        help="Most tickers per worker task, i.e. per batched rollout")
+    args = parser.parse_args()
+
+    tickers = [t.upper() for t in args.tickers] if args.tickers else load_universe(args.universe)
+    time_steps_list = args.time_steps or utils.available_time_steps()
+
+    start = time.perf_counter()
+    fresh = refresh_histories(tickers, config.FETCH_WORKERS)
+    refreshed = time.perf_counter()
+    print(f"Refreshed {len(fresh)}/{len(tickers)} tickers in {refreshed - start:.1f}s")
+
+    # Spread the universe over the workers, at most chunk_size tickers per rollout
+    chunk_size = max(1, min(args.chunk_size, math.ceil(len(fresh) / args.workers)))
+    workers = max(1, min(args.workers, math.ceil(len(fresh) / chunk_size)))
+    written = materialize(fresh, time_steps_list, args.predict_days, workers, chunk_size)
+    print(f"Materialized {written} tickers x {len(time_steps_list)} models "
+          f"({args.predict_days} days) in {time.perf_counter() - refreshed:.1f}s with {workers} workers")
+
+
+if __name__ == "__main__":
+    main()
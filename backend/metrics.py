@@ -0,0 +1,131 @@
+"""In-process counters and latency histograms, rendered in the Prometheus text format.
+
+Stages are timed with `with span("stage"):`. A span costs two clock reads and
+one short lock, so instrumentation stays on; cProfile only runs for requests
+that ask for it (see profile_call).
+"""
+import cProfile
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+import config
+from files import safe_filename
+
+# Seconds; /predict stages range from sub-millisecond cache hits to multi-second rollouts
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+registry = []
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=BUCKETS):
+        self.name, self.help, self.labelnames, self.buckets = name, help, labelnames, buckets
+        self._values = {}  # labels -> [per-bucket counts (+Inf last), sum]
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip([*self.buckets, "+Inf"], counts):
+                    cumulative += count
+                    le = _labels((*self.labelnames, "le"), (*labels, str(bound)))
+                    lines.append(f"{self.name}_bucket{le} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+REQUEST_SECONDS = Histogram("stockpredictor_request_seconds", "HTTP request latency by route", ("method", "route", "status"))
+STAGE_SECONDS = Histogram("stockpredictor_stage_seconds", "Time spent per /predict stage", ("stage",))
+ROLLOUT_STEP_SECONDS = Histogram("stockpredictor_rollout_step_seconds", "Batched rollout time per forecast day",
+                                 ("time_steps",))
+BATCH_SIZE = Histogram("stockpredictor_inference_batch_size", "Windows per batched rollout",
+                       buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+MODEL_LOADS = Counter("stockpredictor_model_loads_total", "Models loaded (or traced) into memory", ("kind", "time_steps"))
+PRICE_STORE = Counter("stockpredictor_price_store_total", "Price store lookups by outcome", ("outcome",))
+
+_local = threading.local()  # Stage timings of the request being profiled on this thread
+
+
+@contextmanager
+def span(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage)
+        timings = getattr(_local, "timings", None)
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+def profile_call(name, fn, *args):
+    # Runs fn under cProfile and writes a pstats file to PROFILE_DIR; returns
+    # (result, path, stage timings) for a Server-Timing header
+    profiler = cProfile.Profile()
+    _local.timings = {}
+    try:
+        result = profiler.runcall(fn, *args)
+    finally:
+        timings, _local.timings = _local.timings, None
+    os.makedirs(config.PROFILE_DIR, exist_ok=True)
+    path = os.path.join(config.PROFILE_DIR, f"{safe_filename(name)}-{time.time_ns()}.prof")
+    profiler.dump_stats(path)
+    return result, path, timings
+
+
+def server_timing(timings):
+    return ", ".join(f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in timings.items())
+
+
+def render(gauges=None):
+    # gauges: {name: (help, labelnames, {labels: value})}, e.g. cache stats read at scrape time
+    lines = []
+    for metric in registry:
+        lines += metric.render()
+    for name, (help, labelnames, values) in (gauges or {}).items():
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+        lines += [f"{name}{_labels(labelnames, labels)} {value}" for labels, value in values.items()]
+    return "\n".join(lines) + "\n"
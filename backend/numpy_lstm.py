@@ -0,0 +1,169 @@
+import json
+import threading
+import numpy as np
+
+
+def _layer_weights(group):
+    # Keras 2 names datasets "kernel:0", Keras 3 nests them one level deeper
+    weights = {}
+
+    def collect(name, obj):
+        if hasattr(obj, "shape"):
+            weights[name.split("/")[-1].split(":")[0]] = obj[()]
+
+    group.visititems(collect)
+    return weights
+
+
+class NumpyLSTM:
+    """Stacked LSTM + Dense forward pass in plain NumPy, matching the Keras models.
+
+    Weights use the Keras layout: kernel (inputs, 4*units), recurrent_kernel
+    (units, 4*units) and bias (4*units,), gates ordered input, forget, cell, output.
+    """
+
+    def __init__(self, lstm_layers, dense_kernel, dense_bias):
+        self.lstm_layers = [tuple(np.asarray(w, dtype=np.float32) for w in layer) for layer in lstm_layers]
+        self.dense_kernel = np.asarray(dense_kernel, dtype=np.float32)
+        self.dense_bias = np.asarray(dense_bias, dtype=np.float32)
+        # Copies with the input/forget/output gate columns halved, see _forward
+        self._gate_layers, self._gate_affine = [], []
+        for kernel, recurrent_kernel, bias in self.lstm_layers:
+            units = recurrent_kernel.shape[0]
+            half = np.full(4 * units, 0.5, dtype=np.float32)
+            half[2 * units:3 * units] = 1
+            offset = np.where(half == 1, 0, 0.5).astype(np.float32)
+            self._gate_layers.append((kernel * half, recurrent_kernel * half, bias * half))
+            self._gate_affine.append((half, offset))
+        self._local = threading.local()
+
+    @classmethod
+    def from_h5(cls, path):
+        import h5py
+        with h5py.File(path, "r") as f:
+            config = json.loads(f.attrs["model_config"])
+            lstm_layers, dense = [], None
+            for layer in config["config"]["layers"]:
+                name, kind = layer["config"]["name"], layer["class_name"]
+                if kind == "LSTM":
+                    if layer["config"].get("activation", "tanh") != "tanh" or \
+                            layer["config"].get("recurrent_activation", "sigmoid") != "sigmoid":
+                        raise ValueError(f"{path}: only tanh/sigmoid LSTM layers are supported")
+                    w = _layer_weights(f["model_weights"][name])
+                    lstm_layers.append((w["kernel"], w["recurrent_kernel"], w["bias"]))
+                elif kind == "Dense":
+                    w = _layer_weights(f["model_weights"][name])
+                    dense = (w["kernel"], w["bias"])
+                elif kind not in ("InputLayer", "Dropout"):
+                    raise ValueError(f"{path}: unsupported layer {kind}")
+        if not lstm_layers or dense is None:
+            raise ValueError(f"{path}: expected LSTM layers followed by a Dense output")
+        return cls(lstm_layers, *dense)
+
+    @classmethod
+    def from_npz(cls, path):
+        with np.load(path) as f:
+            lstm_layers = [(f[f"lstm_{i}_kernel"], f[f"lstm_{i}_recurrent_kernel"], f[f"lstm_{i}_bias"])
+                           for i in range(int(f["lstm_layers"]))]
+            return cls(lstm_layers, f["dense_kernel"], f["dense_bias"])
+
+    def save_npz(self, path):
+        arrays = {"lstm_layers": np.int64(len(self.lstm_layers)),
+                  "dense_kernel": self.dense_kernel, "dense_bias": self.dense_bias}
+        for i, (kernel, recurrent_kernel, bias) in enumerate(self.lstm_layers):
+            arrays[f"lstm_{i}_kernel"] = kernel
+            arrays[f"lstm_{i}_recurrent_kernel"] = recurrent_kernel
+            arrays[f"lstm_{i}_bias"] = bias
+        with open(path, "wb") as f:
+            np.savez(f, **arrays)
+
+    def predict(self, x):
+        # x: (batch, time_steps, inputs) -> (batch, outputs), like model.predict
+        x = np.asarray(x, dtype=np.float32)
+        batch, time_steps, _ = x.shape
+        workspace = self._workspace(batch, time_steps)
+        kernel, _, bias = self._gate_layers[0]
+        projected = workspace.projected[0]
+        np.matmul(x.transpose(1, 0, 2), kernel, out=projected)
+        projected += bias
+        return self._forward(projected, workspace)
+
+    def rollout(self, windows, predict_days):
+        # windows: (batch, time_steps, 1) scaled -> (batch, predict_days) scaled.
+        # Values are appended to one time-major buffer; the first layer's input
+        # projection is computed once per value instead of once per window.
+        windows = np.asarray(windows, dtype=np.float32)
+        batch, time_steps, _ = windows.shape
+        kernel, _, bias = self._gate_layers[0]
+        workspace = self._workspace(batch, time_steps)
+        values = np.empty((time_steps + predict_days, batch, 1), dtype=np.float32)
+        projected = np.empty((time_steps + predict_days, batch, kernel.shape[1]), dtype=np.float32)
+        values[:time_steps] = windows.transpose(1, 0, 2)
+        np.matmul(values[:time_steps], kernel, out=projected[:time_steps])
+        projected[:time_steps] += bias
+        for day in range(predict_days):
+            step = time_steps + day
+            values[step] = self._forward(projected[day:step], workspace)
+            np.matmul(values[step], kernel, out=projected[step])
+            projected[step] += bias
+        return values[time_steps:, :, 0].T
+
+    def _forward(self, projected, workspace):
+        # projected: first layer input projection, time-major (time_steps, batch, 4*units)
+        last = len(self._gate_layers) - 1
+        for n, (kernel, recurrent_kernel, bias) in enumerate(self._gate_layers):
+            if n > 0:
+                projected = workspace.projected[n]
+                np.matmul(workspace.outputs[n - 1], kernel, out=projected)
+                projected += bias
+            units = recurrent_kernel.shape[0]
+            scale, offset = self._gate_affine[n]
+            z, c, tmp = workspace.z[n], workspace.c[n], workspace.tmp[n]
+            outputs = workspace.outputs[n]
+            c.fill(0)
+            h = None
+            for t in range(projected.shape[0]):
+                if h is None:
+                    z[...] = projected[t]
+                else:
+                    np.matmul(h, recurrent_kernel, out=z)
+                    z += projected[t]
+                # One tanh for all four gates; the sigmoid gates were pre-scaled
+                # by 1/2 so sigmoid(x) = 0.5 * tanh(x / 2) + 0.5
+                np.tanh(z, out=z)
+                z *= scale
+                z += offset
+                i, f, g, o = z[:, :units], z[:, units:2 * units], z[:, 2 * units:3 * units], z[:, 3 * units:]
+                c *= f
+                np.multiply(i, g, out=tmp)
+                c += tmp
+                np.tanh(c, out=tmp)
+                h = outputs[0 if n == last else t]
+                np.multiply(o, tmp, out=h)
+        return h @ self.dense_kernel + self.dense_bias
+
+    def _workspace(self, batch, time_steps):
+        # Gate and state buffers are reused across calls of the same shape;
+        # kept per thread since batches for one model may run concurrently.
+        cache = getattr(self._local, "workspaces", None)
+        if cache is None:
+            cache = self._local.workspaces = {}
+        key = (batch, time_steps)
+        if key not in cache:
+            if len(cache) >= 8:
+                cache.clear()
+            cache[key] = _Workspace(self._gate_layers, batch, time_steps)
+        return cache[key]
+
+
+class _Workspace:
+    def __init__(self, gate_layers, batch, time_steps):
+        self.projected, self.outputs, self.z, self.c, self.tmp = [], [], [], [], []
+        last = len(gate_layers) - 1
+        for n, (_, recurrent_kernel, _) in enumerate(gate_layers):
+            units = recurrent_kernel.shape[0]
+            self.projected.append(np.empty((time_steps, batch, 4 * units), dtype=np.float32))
+            self.outputs.append(np.empty((1 if n == last else time_steps, batch, units), dtype=np.float32))
+            self.z.append(np.empty((batch, 4 * units), dtype=np.float32))
+            self.c.append(np.empty((batch, units), dtype=np.float32))
+            self.tmp.append(np.empty((batch, units), dtype=np.float32))
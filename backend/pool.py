@@ -0,0 +1,9 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+def process_pool(workers, initializer=None, initargs=()):
+    # spawn, not fork: TensorFlow does not survive a fork once the parent has
+    # loaded it, and workers import only what their task needs
+    return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"),
+                               initializer=initializer, initargs=initargs)
@@ -0,0 +1,137 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+import config
+from files import safe_filename
+from cache import TTLCache
+import metrics
+import upstream
+
+COLUMNS = ['Open', 'High', 'Low', 'Close', 'Adj Close', 'Volume']
+
+
+def yahoo_history(ticker, **kwargs):
+    # Ticker.history raises YFRateLimitError, where yf.download only logs it,
+    # so the upstream limiter can back off
+    data = yf.Ticker(ticker).history(auto_adjust=False, actions=False, **kwargs)
+    if data is None or data.empty:
+        return None
+    data.index = data.index.tz_localize(None).rename('Date')  # Exchange-local dates, as yf.download gives
+    return data.dropna(subset=['Close'])
+
+
+def yfinance_fetcher(ticker, start=None):
+    # start=None means the full history, otherwise every bar from start (inclusive)
+    if start is None:
+        return yahoo_history(ticker, period="max")
+    return yahoo_history(ticker, start=start.strftime("%Y-%m-%d"))
+
+
+class PriceStore:
+    """Per-ticker daily bars kept on disk, refreshed by fetching only the missing tail.
+
+    Each ticker is stored as one .npz file holding one array per column plus the
+    dates as int64 nanoseconds. `fetcher(ticker, start=None)` returns a DataFrame
+    indexed by date (or None) and can be swapped for an offline source; calls to
+    it go through the process-wide upstream limiter.
+    """
+
+    def __init__(self, root=None, fetcher=yfinance_fetcher, stale_after=None, memory_size=None):
+        self.root = root or config.PRICE_STORE_DIR
+        self.fetcher = fetcher
+        self.stale_after = config.PRICE_STALE_SECONDS if stale_after is None else stale_after
+        # ticker -> (frame, checked_at) for the most recently used tickers; the rest are read from disk
+        memory_size = config.PRICE_STORE_MEMORY_SIZE if memory_size is None else memory_size
+        self._memory = TTLCache(memory_size, float("inf"))
+
+    def path(self, ticker):
+        return os.path.join(self.root, f"{safe_filename(ticker.upper())}.npz")
+
+    def get(self, ticker):
+        ticker = ticker.upper()
+        cached = self._memory.get(ticker, count=False)
+        frame, checked_at = cached or self._read(ticker)
+        if frame is not None and time.time() - checked_at < self.stale_after:
+            metrics.PRICE_STORE.inc("memory" if cached else "disk")
+            return frame
+
+        metrics.PRICE_STORE.inc("refresh" if frame is not None else "fetch")
+        frame = self._refresh(ticker, frame)
+        if frame is not None:
+            self._memory.set(ticker, (frame, time.time()))
+            self._write(ticker, frame)
+        return frame
+
+    def invalidate(self, ticker):
+        ticker = ticker.upper()
+        self._memory.pop(ticker)
+        if os.path.exists(self.path(ticker)):
+            os.remove(self.path(ticker))
+
+    def _refresh(self, ticker, frame):
+        if frame is None or len(frame) < 2:
+            return self._clean(self._fetch(ticker))
+
+        # Re-fetch from the second to last stored bar: that bar is complete, so it
+        # must come back unchanged unless history was re-adjusted (e.g. a split),
+        # and the last bar may have been a partial session that needs replacing.
+        anchor = frame.index[-2]
+        try:
+            tail = self._clean(self._fetch(ticker, start=anchor))
+        except Exception as e:
+            print(f"Price store refresh failed for {ticker}: {e}")
+            return frame
+        if tail is None:
+            return frame
+
+        if anchor not in tail.index or not np.isclose(tail.at[anchor, 'Close'], frame.at[anchor, 'Close']):
+            print(f"History changed for {ticker}, fetching full history.")
+            full = self._clean(self._fetch(ticker))
+            return full if full is not None else frame
+
+        return pd.concat([frame[frame.index < anchor], tail])
+
+    def _fetch(self, ticker, start=None):
+        return upstream.limiter.call(self.fetcher, ticker, start=start)
+
+    @staticmethod
+    def _clean(data):
+        if data is None or data.empty:
+            return None
+        data = data.dropna(subset=['Close'])
+        data = data[[c for c in COLUMNS if c in data.columns]]
+        data = data[~data.index.duplicated(keep='last')].sort_index()
+        return data if not data.empty else None
+
+    def _read(self, ticker):
+        path = self.path(ticker)
+        if not os.path.exists(path):
+            return None, 0.0
+        try:
+            with np.load(path) as stored:
+                index = pd.DatetimeIndex(stored['dates'].astype('datetime64[ns]'), name='Date')
+                columns = [c for c in COLUMNS if c in stored.files]
+                frame = pd.DataFrame({c: stored[c] for c in columns}, index=index)
+                checked_at = float(stored['checked_at'])
+        except Exception as e:
+            print(f"Ignoring unreadable price file {path}: {e}")
+            return None, 0.0
+        self._memory.set(ticker, (frame, checked_at))
+        return frame, checked_at
+
+    def _write(self, ticker, frame):
+        os.makedirs(self.root, exist_ok=True)
+        path = self.path(ticker)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        arrays = {c: frame[c].to_numpy() for c in frame.columns}
+        arrays['dates'] = frame.index.values.astype('datetime64[ns]').astype(np.int64)
+        arrays['checked_at'] = np.float64(time.time())
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, **arrays)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Could not write price file {path}: {e}")
@@ -0,0 +1,48 @@
+import hashlib
+import threading
+from cache import TTLCache
+
+
+def bar_signature(data):
+    # Changes whenever a bar is added or the latest (possibly partial) bar moves
+    return f"{data.index[-1]:%Y-%m-%d}|{len(data)}|{data['Close'].iloc[-1]!r}"
+
+
+class ResponseCache:
+    """Finished /predict responses keyed by request parameters and the last bar.
+
+    The key doubles as the response ETag. When a ticker's last bar changes, the
+    entries built on the old bars are dropped rather than left to age out.
+    """
+
+    def __init__(self, maxsize=256, ttl=24 * 3600):
+        self.entries = TTLCache(maxsize, ttl)
+        self.invalidations = 0
+        self._by_ticker = {}  # ticker -> (bar signature, keys built on it)
+        self._lock = threading.Lock()
+
+    def key(self, ticker, params, data):
+        signature = bar_signature(data)
+        with self._lock:
+            current = self._by_ticker.get(ticker)
+            if current is None or current[0] != signature:
+                if current is not None:
+                    for key in current[1]:
+                        self.entries.pop(key)
+                    self.invalidations += 1
+                self._by_ticker[ticker] = (signature, set())
+        raw = "|".join([ticker, *map(str, params), signature])
+        return '"' + hashlib.sha1(raw.encode()).hexdigest()[:20] + '"'
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, ticker, key, response):
+        with self._lock:
+            current = self._by_ticker.get(ticker)
+            if current is not None:
+                current[1].add(key)
+        self.entries.set(key, response)
+
+    def stats(self):
+        return {**self.entries.stats(), "invalidations": self.invalidations}
@@ -0,0 +1,68 @@
+import numpy as np
+from sklearn.preprocessing import MinMaxScaler
+
+from ticker_state import CommittedBars, TickerStateCache
+
+
+def minmax_params(low, high):
+    # MinMaxScaler's scale_ and min_ for feature_range (0, 1), elementwise over
+    # arrays of bounds; a zero range scales by 1, as sklearn does
+    span = high - low
+    scale = 1.0 / np.where(span == 0, 1.0, span)
+    return scale, -low * scale
+
+
+class _TickerScale(CommittedBars):
+    # Min/max of the committed closes and the scaler last fitted to them plus
+    # the latest close
+
+    def __init__(self, dates, close):
+        super().__init__(dates, close)
+        self.low, self.high = close[:-1].min(), close[:-1].max()
+        self.bounds = None
+        self.scaler = None
+
+    def update(self, dates, close):
+        new = close[self.committed:-1]
+        if len(new):
+            self.low, self.high = min(self.low, new.min()), max(self.high, new.max())
+        self.commit(dates, close)
+
+    def fitted(self, latest):
+        bounds = (min(self.low, latest), max(self.high, latest))
+        if bounds != self.bounds:
+            # A fresh scaler, since requests may still hold the old one. Fitting
+            # the two bounds gives the same parameters as fitting every close.
+            self.scaler = MinMaxScaler(feature_range=(0, 1)).fit(np.array(bounds).reshape(-1, 1))
+            self.bounds = bounds
+        return self.scaler
+
+
+class ScalerCache(TickerStateCache):
+    """The MinMaxScaler over each ticker's full close history, kept current as bars arrive.
+
+    New bars only move the stored min/max, and the scaler is refitted only when
+    that range changes, so a request costs O(new bars) instead of a fit over
+    the whole history.
+    """
+
+    state_class = _TickerScale
+
+    def __init__(self, maxsize=512):
+        super().__init__(maxsize)
+        self.refits = 0
+
+    def fit(self, ticker, close):
+        if len(close) < 2 or self.maxsize <= 0:
+            return MinMaxScaler(feature_range=(0, 1)).fit(close.to_numpy(dtype=np.float64).reshape(-1, 1))
+        return self.apply(ticker, close, self._fitted)
+
+    def _fitted(self, state):
+        # Runs under the cache lock
+        previous = state.scaler
+        scaler = state.fitted(state.latest)
+        self.refits += scaler is not previous
+        return scaler
+
+    def stats(self):
+        return {**super().stats(), "refits": self.refits}
@@ -0,0 +1,76 @@
+import threading
+import time
+import numpy as np
+
+import metrics
+
+
+class _Batch:
+    def __init__(self):
+        self.windows = []
+        self.horizons = []
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.results = None
+        self.error = None
+
+
+class InferenceScheduler:
+    """Groups concurrent forecasts for the same time_steps model into one batch.
+
+    The first caller for a model opens a batch and waits up to max_wait seconds
+    (or until max_batch windows joined), then runs `run_batch(time_steps, windows,
+    predict_days)` once for everyone, forecasting the longest horizon requested.
+    Every caller gets back its own row, cut to its own predict_days.
+    """
+
+    def __init__(self, run_batch, max_wait=0.005, max_batch=64):
+        self.run_batch = run_batch
+        self.max_wait = max_wait
+        self.max_batch = max_batch
+        self.stats = {"requests": 0, "batches": 0, "largest_batch": 0}
+        self._open = {}  # time_steps -> batch still accepting windows
+        self._lock = threading.Lock()
+
+    def submit(self, time_steps, window, predict_days):
+        with self._lock:
+            batch = self._open.get(time_steps)
+            leader = batch is None
+            if leader:
+                batch = self._open[time_steps] = _Batch()
+            index = len(batch.windows)
+            batch.windows.append(np.asarray(window, dtype=np.float32).reshape(time_steps, 1))
+            batch.horizons.append(predict_days)
+            if len(batch.windows) >= self.max_batch:
+                del self._open[time_steps]
+                batch.full.set()
+            self.stats["requests"] += 1
+
+        if leader:
+            self._run(time_steps, batch)
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+        return batch.results[index, :predict_days]
+
+    def _run(self, time_steps, batch):
+        batch.full.wait(self.max_wait)
+        with self._lock:
+            if self._open.get(time_steps) is batch:
+                del self._open[time_steps]
+            self.stats["batches"] += 1
+            self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch.windows))
+        predict_days = max(batch.horizons)
+        metrics.BATCH_SIZE.observe(len(batch.windows))
+        try:
+            start = time.perf_counter()
+            with metrics.span("rollout"):
+                batch.results = self.run_batch(time_steps, np.stack(batch.windows), predict_days)
+            if predict_days > 0:
+                metrics.ROLLOUT_STEP_SECONDS.observe((time.perf_counter() - start) / predict_days, time_steps)
+        except Exception as e:
+            batch.error = e
+        finally:
+            batch.done.set()
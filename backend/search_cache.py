@@ -0,0 +1,55 @@
+import asyncio
+from cache import TTLCache
+
+
+def matches(result, query):
+    return query in result["ticker"].upper() or query in (result["name"] or "").upper()
+
+
+class SearchCache:
+    """Ticker search results cached by query, with prefix reuse and coalescing.
+
+    `fetch(query)` is a coroutine returning (results, complete), where complete
+    means upstream returned everything it had for the query. A complete entry
+    for "AP" answers "APP" by filtering, without another upstream call.
+    Concurrent misses for the same query share one upstream call.
+    """
+
+    def __init__(self, fetch, maxsize=2048, ttl=6 * 3600):
+        self.fetch = fetch
+        self.entries = TTLCache(maxsize, ttl)
+        self.prefix_hits = 0
+        self.coalesced = 0
+        self._inflight = {}  # query -> task
+
+    async def search(self, query):
+        key = query.upper()
+        entry = self.entries.get(key)
+        if entry is not None:
+            return entry[0]
+
+        for end in range(len(key) - 1, 0, -1):
+            entry = self.entries.get(key[:end], count=False)
+            if entry is not None and entry[1]:
+                self.prefix_hits += 1
+                results = [r for r in entry[0] if matches(r, key)]
+                self.entries.set(key, (results, True))
+                return results
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._inflight[key] = asyncio.ensure_future(self._load(key))
+        else:
+            self.coalesced += 1
+        return (await asyncio.shield(task))[0]
+
+    async def _load(self, key):
+        try:
+            entry = await self.fetch(key)
+            self.entries.set(key, entry)
+            return entry
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self):
+        return {**self.entries.stats(), "prefix_hits": self.prefix_hits, "coalesced": self.coalesced}
@@ -0,0 +1,111 @@
+import base64
+import numpy as np
+import orjson
+import pandas as pd
+
+
+def _default(obj):
+    if isinstance(obj, np.ndarray):
+        return np.ascontiguousarray(obj)  # orjson only encodes C-contiguous arrays natively
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError(f"Cannot serialize {type(obj).__name__}")
+
+
+def dumps(obj):
+    # NaN and inf, in floats or inside float arrays, are encoded as null
+    return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def format_dates(index):
+    return np.datetime_as_string(index.values, unit='D').tolist()
+
+
+# /predict payload encodings. The default is plain JSON; the compact form sends
+# each date axis as a start date plus day offsets and each series as base64
+# little-endian float32 (NaN stays NaN), e.g.
+#   {"start": "2024-01-02", "unit": "B", "offsets": "<base64 int32>"}
+# where unit "B" counts business days (numpy busday rules) and "D" calendar days.
+COMPACT_MEDIA_TYPE = "application/vnd.stockpredictor.compact+json"
+
+
+def encode_floats(values):
+    return base64.b64encode(np.asarray(values, dtype='<f4').tobytes()).decode('ascii')
+
+
+def encode_dates(dates):
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    if len(dates) == 0:
+        return {"start": None, "unit": "B", "offsets": ""}
+    start = dates[0]
+    if np.is_busday(dates).all():
+        unit, offsets = "B", np.busday_count(start, dates)
+    else:  # Weekend sessions (e.g. crypto) need calendar offsets
+        unit, offsets = "D", (dates - start).astype(np.int64)
+    return {
+        "start": str(start),
+        "unit": unit,
+        "offsets": base64.b64encode(offsets.astype('<i4').tobytes()).decode('ascii'),
+    }
+
+
+def _map_series(result, dates_fn, values_fn):
+    payload = {
+        "historical": {"dates": dates_fn(result["historical"]["dates"]),
+                       "prices": values_fn(result["historical"]["prices"])},
+        "predicted": {"dates": dates_fn(result["predicted"]["dates"]),
+                      "prices": values_fn(result["predicted"]["prices"])},
+        "indicators": {key: ({k: values_fn(v) for k, v in value.items()} if isinstance(value, dict) else values_fn(value))
+                       for key, value in result["indicators"].items()},
+    }
+    if "error" in result:
+        payload["error"] = result["error"]
+    return payload
+
+
+def json_payload(result):
+    return _map_series(result, lambda dates: format_dates(pd.DatetimeIndex(dates)), lambda values: values)
+
+
+def compact_payload(result):
+    payload = _map_series(result, encode_dates, encode_floats)
+    payload["encoding"] = "compact-v1"
+    return payload
+
+
+def lttb_indices(values, max_points):
+    # Largest-Triangle-Three-Buckets: keep the first and last point plus, per
+    # bucket, the point forming the largest triangle with its neighbours
+    n = len(values)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+    y = np.asarray(values, dtype=np.float64)
+    x = np.arange(n, dtype=np.float64)
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    edges = np.append(edges, n)
+    indices = np.empty(max_points, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2]
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        indices[bucket + 1] = a
+    return indices
+
+
+def downsample(result, max_points):
+    # Thin the historical series to max_points, keeping indicators aligned to it
+    if len(result["historical"]["prices"]) <= max_points:
+        return result
+    keep = lttb_indices(result["historical"]["prices"], max_points)
+    thinned = dict(result)
+    thinned["historical"] = {key: np.asarray(value)[keep] for key, value in result["historical"].items()}
+    thinned["indicators"] = {
+        key: ({k: v[keep] for k, v in value.items()} if isinstance(value, dict) else value[keep])
+        for key, value in result["indicators"].items()
+    }
+    return thinned
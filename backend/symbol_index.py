@@ -0,0 +1,118 @@
+"""Local ticker autocomplete index over symbols and company names.
+
+Rebuild the bundled listing from Nasdaq Trader (all US-listed securities):
+    python symbol_index.py --refresh [--path symbols.csv]
+"""
+import argparse
+import csv
+import os
+import re
+from bisect import bisect_left
+
+import httpx
+
+NASDAQ_TRADED_URL = "https://www.nasdaqtrader.com/dynamic/SymDir/nasdaqtraded.txt"
+# Nasdaq Trader listing exchange codes -> Yahoo exchange codes
+EXCHANGES = {"Q": "NMS", "N": "NYQ", "A": "ASE", "P": "PCX", "Z": "BTS", "V": "IEX"}
+FIELDS = ["ticker", "name", "exchange", "type"]
+
+
+class SymbolIndex:
+    """Sorted prefix index: one sorted key list for symbols, one for name words."""
+
+    def __init__(self, rows):
+        self.rows = [row for row in rows if row["type"] == "EQUITY"]
+        symbols = sorted((row["ticker"].upper(), i) for i, row in enumerate(self.rows))
+        # Every word of the name is a key, plus the whole name for multi-word queries
+        words = sorted({(word, i) for i, row in enumerate(self.rows)
+                        for word in re.findall(r"[A-Z0-9&]+", row["name"].upper()) + [row["name"].upper()]})
+        self._symbol_keys = [key for key, _ in symbols]
+        self._symbol_ids = [i for _, i in symbols]
+        self._word_keys = [key for key, _ in words]
+        self._word_ids = [i for _, i in words]
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, path):
+        with open(path, newline="") as f:
+            return cls(list(csv.DictReader(f)))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def search(self, query, limit=10):
+        query = query.strip().upper()
+        if not query:
+            return []
+        # Exact symbol, then symbol prefixes (shortest first), then name words
+        symbol_ids = sorted(self._prefix(self._symbol_keys, self._symbol_ids, query),
+                            key=lambda i: len(self.rows[i]["ticker"]))
+        found = symbol_ids[:limit]
+        seen = set(found)
+        if len(found) < limit:
+            for i in self._prefix(self._word_keys, self._word_ids, query):
+                if i not in seen:
+                    seen.add(i)
+                    found.append(i)
+                    if len(found) >= limit:
+                        break
+        if len(found) >= limit:
+            self.hits += 1  # Answered without the upstream search
+        else:
+            self.misses += 1
+        return [dict(self.rows[i]) for i in found[:limit]]
+
+    @staticmethod
+    def _prefix(keys, ids, prefix):
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + "\uffff", lo=start)
+        return ids[start:end]
+
+
+def parse_nasdaq_traded(text):
+    rows = []
+    reader = csv.DictReader(text.splitlines(), delimiter="|")
+    for line in reader:
+        symbol = line.get("Symbol") or ""
+        # Skip the file footer, test issues and preferred/when-issued style symbols
+        if not symbol or line.get("Test Issue") == "Y" or re.search(r"[$^#]", symbol):
+            continue
+        rows.append({
+            "ticker": symbol.replace(".", "-"),  # Yahoo writes BRK.B as BRK-B
+            "name": line.get("Security Name", "").split(" - ")[0].strip(),
+            "exchange": EXCHANGES.get(line.get("Listing Exchange"), line.get("Listing Exchange")),
+            "type": "ETF" if line.get("ETF") == "Y" else "EQUITY",
+        })
+    return rows
+
+
+def refresh(path, url=NASDAQ_TRADED_URL):
+    response = httpx.get(url, timeout=60, follow_redirects=True)
+    response.raise_for_status()
+    rows = parse_nasdaq_traded(response.text)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(sorted(rows, key=lambda row: row["ticker"]))
+    os.replace(tmp_path, path)
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--path", default="symbols.csv")
+    parser.add_argument("--refresh", action="store_true", help="Download the current listing first")
+    parser.add_argument("query", nargs="?")
+    args = parser.parse_args()
+
+    if args.refresh:
+        print(f"Wrote {refresh(args.path)} symbols to {args.path}")
+    if args.query:
+        for row in SymbolIndex.load(args.path).search(args.query):
+            print(f"{row['ticker']:<8} {row['exchange'] or '':<4} {row['name']}")
+
+
+if __name__ == "__main__":
+    main()
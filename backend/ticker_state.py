@@ -0,0 +1,68 @@
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+import numpy as np
+
+
+class CommittedBars(ABC):
+    """Per-ticker state derived from a close series, extended as bars arrive.
+
+    Every bar but the last is committed; the last may be a partial session that
+    gets revised, so subclasses fold it in on every read. The state stays valid
+    while the last committed bar is unchanged; update() then only has to look
+    at close[self.committed:].
+    """
+
+    def __init__(self, dates, close):
+        self.commit(dates, close)
+
+    def matches(self, dates, close):
+        n = self.committed
+        return len(close) > n and dates[n - 1] == self.last_date and close[n - 1] == self.last_close
+
+    @abstractmethod
+    def update(self, dates, close):
+        """Fold close[self.committed:-1] into the state, then commit(dates, close)."""
+
+    def commit(self, dates, close):
+        self.committed = len(close) - 1
+        self.last_date = dates[self.committed - 1]
+        self.last_close = close[self.committed - 1]
+        self.latest = close[-1]  # The last, possibly partial, bar
+
+
+class TickerStateCache:
+    """Bounded LRU of CommittedBars states, one per ticker.
+
+    apply() builds a ticker's state on first sight, or when a committed bar
+    changed (e.g. re-adjusted history), updates it otherwise, and runs a read
+    of it under the cache lock.
+    """
+
+    state_class = CommittedBars
+
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self.builds = 0
+        self.updates = 0
+        self._tickers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def apply(self, ticker, close, read):
+        dates, values = close.index, close.to_numpy(dtype=np.float64)
+        with self._lock:
+            state = self._tickers.get(ticker)
+            if state is not None and state.matches(dates, values):
+                state.update(dates, values)
+                self.updates += 1
+            else:
+                state = self.state_class(dates, values)
+                self.builds += 1
+            self._tickers[ticker] = state
+            self._tickers.move_to_end(ticker)
+            while len(self._tickers) > self.maxsize:
+                self._tickers.popitem(last=False)
+            return read(state)
+
+    def stats(self):
+        return {"size": len(self._tickers), "maxsize": self.maxsize, "builds": self.builds, "updates": self.updates}
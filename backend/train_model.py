@@ -1,41 +1,119 @@
-import yfinance as yf
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+import argparse
+import json
+import time
 import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+import tensorflow as tf
 from tensorflow.keras.models import load_model, Sequential
 from tensorflow.keras.layers import LSTM, Dense, Dropout
-from sklearn.preprocessing import MinMaxScaler
-from sklearn.model_selection import train_test_split
+import math
 import os
 
+import config
+from numpy_lstm import NumpyLSTM
+from pool import process_pool
+from price_store import PriceStore
+from scaler_cache import minmax_params
+
 # Expanded tickers: Mix of mega, large, mid, and small caps for diversity
 tickers = [
     'AAPL', 'MSFT', 'NVDA', 'AMZN', 'GOOGL', 'META', 'TSLA', 'JPM', 'WMT', 'XOM', 'PYPL', 'ZS', 'PLTR', 'AEO', 'JBLU'
 ]
+HISTORY_YEARS = 15
 
-all_prices = [] # Collect raw prices first, then scale combined
-
-for ticker in tickers:
+def load_ticker(store, ticker):
+    # The last HISTORY_YEARS of raw closes, with the min/max of every close up
+    # to each bar: the range prepare_data_for_prediction scales with on that day
     try:
-        data = yf.download(ticker, period='15y', auto_adjust=False)
-        if data.empty:
-            print(f"No data for {ticker}, skipping.")
-            continue
-        data.columns = data.columns.get_level_values(0)
-        data = data.dropna(subset=['Close'])
-        prices = data['Close'].values.reshape(-1, 1)
-        all_prices.append(prices)
+        data = store.get(ticker)
     except Exception as e:
         print(f"Failed to get {ticker}: {e}")
+        return None
+    if data is None or data.empty:
+        print(f"No data for {ticker}, skipping.")
+        return None
+    close = data['Close'].to_numpy(dtype=np.float64)
+    bars = np.stack([close, np.minimum.accumulate(close), np.maximum.accumulate(close)])
+    start = data.index[-1] - pd.DateOffset(years=HISTORY_YEARS)
+    return bars[:, data.index >= start]
+
+def build_dataset(path, store):
+    # All tickers' bars back to back as (close, low, high) rows, plus where each one starts
+    with ThreadPoolExecutor(config.FETCH_WORKERS) as pool:
+        loaded = list(pool.map(lambda ticker: load_ticker(store, ticker), tickers))
+    kept = [(ticker, bars) for ticker, bars in zip(tickers, loaded) if bars is not None]
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, "bars.npy"), np.concatenate([bars for _, bars in kept], axis=1))
+    np.save(os.path.join(path, "offsets.npy"), np.cumsum([0] + [bars.shape[1] for _, bars in kept]))
+    with open(os.path.join(path, "tickers.txt"), "w") as f:
+        f.write("\n".join(ticker for ticker, _ in kept))
 
-combined_prices = np.concatenate(all_prices, axis=0)
+def load_dataset(path):
+    # The bars are memory-mapped, so repeated runs skip the download
+    bars = np.load(os.path.join(path, "bars.npy"), mmap_mode='r')
+    offsets = np.load(os.path.join(path, "offsets.npy"))
+    return bars, offsets
 
-# Scale the combined data
-scaler = MinMaxScaler(feature_range=(0, 1))
-combined_scaled = scaler.fit_transform(combined_prices)
+def scaled_samples(bars, starts, time_steps, horizon=1):
+    # Window close[i:i + time_steps] and the next `horizon` closes, both scaled
+    # with the min/max at the window's last bar, as serving would have on that day
+    close, low, high = bars
+    last = starts + time_steps - 1
+    scale, offset = minmax_params(low[last], high[last])
+    windows = sliding_window_view(close, time_steps)[starts] * scale[:, None] + offset[:, None]
+    targets = sliding_window_view(close, horizon)[starts + time_steps] * scale[:, None] + offset[:, None]
+    return windows[..., np.newaxis].astype(np.float32), targets.astype(np.float32)
+
+def window_starts(offsets, time_steps, test_fraction=0.2, horizon=1):
+    # Windows (and their horizon targets) never cross from one ticker into the
+    # next; the last test_fraction of each ticker's windows is held out, as
+    # train_test_split(shuffle=False) per ticker
+    train, test = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+    for begin, end in zip(offsets[:-1], offsets[1:]):
+        samples = end - begin - time_steps - horizon + 1
+        if samples <= 0:
+            continue
+        split = begin + samples - math.ceil(samples * test_fraction)
+        train.append(np.arange(begin, split))
+        test.append(np.arange(split, begin + samples))
+    return np.concatenate(train), np.concatenate(test)
 
 # List of TIME_STEPS to train (matching frontend predictDaysOptions)
 TIME_STEPS_LIST = [1, 5, 10, 20, 60, 120]
+BATCH_SIZE = 32
+# The direct model: one window in, the next DIRECT_HORIZON days out
+DIRECT_TIME_STEPS = 120
+DIRECT_HORIZON = 120
+# Horizons reported in the training log for the direct model
+REPORT_HORIZONS = [1, 5, 10, 20, 60, 120]
+LOG_PATH = "models/training_log.jsonl"
+
+def window_dataset(bars, time_steps, starts, shuffle=False, horizon=1):
+    # Samples for each start i: window close[i:i + time_steps] -> target close[i + time_steps]
+    # (the next horizon values when horizon > 1), scaled by scaled_samples. Only
+    # one batch is read and scaled at a time.
+    def batches():
+        order = starts.copy()
+        if shuffle:
+            np.random.shuffle(order)  # Reshuffled every epoch, like fit() on arrays
+        for i in range(0, len(order), BATCH_SIZE):
+            windows, targets = scaled_samples(bars, order[i:i + BATCH_SIZE], time_steps, horizon)
+            yield windows, targets[:, 0] if horizon == 1 else targets
+
+    target_shape = (None,) if horizon == 1 else (None, horizon)
+    signature = (tf.TensorSpec((None, time_steps, 1), tf.float32), tf.TensorSpec(target_shape, tf.float32))
+    return tf.data.Dataset.from_generator(batches, output_signature=signature).prefetch(tf.data.AUTOTUNE)
 
-def create_model(time_steps):
+def load_for_training(model_path):
+    # Keras 3 cannot resume an optimizer restored from .h5; start a fresh one
+    model = load_model(model_path, compile=False)
+    model.compile(optimizer='adam', loss='mean_squared_error')
+    return model
+
+def create_model(time_steps, outputs=1):
     model = Sequential()
     model.add(LSTM(units=50, return_sequences=True, input_shape=(time_steps, 1)))
     model.add(Dropout(0.2))
@@ -43,45 +121,162 @@ def create_model(time_steps):
     model.add(Dropout(0.2))
     model.add(LSTM(units=50))
     model.add(Dropout(0.2))
-    model.add(Dense(units=1))
+    model.add(Dense(units=outputs))
     model.compile(optimizer='adam', loss='mean_squared_error')
     return model
 
-for TIME_STEPS in TIME_STEPS_LIST:
-    print(f"\nTraining for TIME_STEPS = {TIME_STEPS}")
-
-    X, y = [], []
-    for i in range(TIME_STEPS, len(combined_scaled)):
-        X.append(combined_scaled[i - TIME_STEPS:i, 0])
-        y.append(combined_scaled[i, 0])
-    X, y = np.array(X), np.array(y)
-    X = X.reshape(X.shape[0], X.shape[1], 1)
+def train_horizon(time_steps, dataset, epochs=None):
+    # Train or fine-tune models/model_{time_steps}.h5; returns its training log entry
+    print(f"\nTraining for TIME_STEPS = {time_steps}")
+    bars, offsets = load_dataset(dataset)
+    train_starts, test_starts = window_starts(offsets, time_steps)
+    if len(train_starts) == 0 or len(test_starts) == 0:
+        print(f"Not enough data for TIME_STEPS={time_steps}, skipping.")
+        return None
 
-    if len(X) == 0:
-        print(f"Not enough data for TIME_STEPS={TIME_STEPS}, skipping.")
-        continue
+    train_data = window_dataset(bars, time_steps, train_starts, shuffle=True)
+    test_data = window_dataset(bars, time_steps, test_starts)
 
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, shuffle=False)
-
-    model_path = f'models/model_{TIME_STEPS}.h5'
+    model_path = f'models/model_{time_steps}.h5'
 
     if os.path.exists(model_path):
-        model = load_model(model_path)
+        model = load_for_training(model_path)
         print(f"Loaded existing model {model_path}")
-        epochs = 10 # Fine-tune with fewer epochs
+        epochs = epochs or 10 # Fine-tune with fewer epochs
     else:
-        model = create_model(TIME_STEPS)
-        print(f"Created new model for {TIME_STEPS}")
-        epochs = 50 # Train new model with more epochs
+        model = create_model(time_steps)
+        print(f"Created new model for {time_steps}")
+        epochs = epochs or 50 # Train new model with more epochs
 
     # Train or fine-tune
-    history = model.fit(X_train, y_train, epochs=epochs, batch_size=32, validation_data=(X_test, y_test))
+    start = time.perf_counter()
+    model.fit(train_data, epochs=epochs, validation_data=test_data, verbose=2)
+    seconds = time.perf_counter() - start
 
-    test_loss = model.evaluate(X_test, y_test)
+    test_loss = model.evaluate(test_data, verbose=0)
     print(f"Test Loss after training: {test_loss}")
 
     # Save the model (overwrite)
     model.save(model_path)
     print(f"Model saved as {model_path}")
+    return {"model": model_path, "time_steps": time_steps, "horizon": 1, "epochs": epochs,
+            "seconds": round(seconds, 1), "test_loss": test_loss}
+
+def autoregressive_errors(model_path, windows, targets):
+    # Per-day squared error of rolling a one-day model forward over the horizon,
+    # as serving does; NumpyLSTM also reads the older .h5 files Keras 3 rejects
+    model = NumpyLSTM.from_h5(model_path)
+    preds = model.rollout(windows, targets.shape[1])
+    return ((preds - targets) ** 2).mean(axis=0)
+
+def train_direct(dataset, epochs=None, time_steps=DIRECT_TIME_STEPS, horizon=DIRECT_HORIZON):
+    # One model predicting the next `horizon` days at once, served with
+    # FORECAST_MODEL=direct in place of the per-time_steps autoregressive models
+    print(f"\nTraining direct model: {time_steps} days in, {horizon} days out")
+    bars, offsets = load_dataset(dataset)
+    train_starts, test_starts = window_starts(offsets, time_steps, horizon=horizon)
+    if len(train_starts) == 0 or len(test_starts) == 0:
+        print("Not enough data for the direct model, skipping.")
+        return None
+
+    train_data = window_dataset(bars, time_steps, train_starts, shuffle=True, horizon=horizon)
+    test_data = window_dataset(bars, time_steps, test_starts, horizon=horizon)
+
+    model_path = f'models/model_direct_{time_steps}.h5'
+    if os.path.exists(model_path):
+        model = load_for_training(model_path)
+        epochs = epochs or 10
+    else:
+        model = create_model(time_steps, outputs=horizon)
+        epochs = epochs or 50
+
+    start = time.perf_counter()
+    model.fit(train_data, epochs=epochs, validation_data=test_data, verbose=2)
+    seconds = time.perf_counter() - start
+    test_loss = model.evaluate(test_data, verbose=0)
+    model.save(model_path)
+    print(f"Model saved as {model_path}")
+
+    # Error by horizon on a sample of test windows, next to the autoregressive
+    # model with the same window length when one exists
+    sample = np.sort(np.random.default_rng(0).choice(test_starts, min(len(test_starts), 1024), replace=False))
+    windows, targets = scaled_samples(bars, sample, time_steps, horizon)
+    direct_errors = ((model.predict(windows, verbose=0) - targets) ** 2).mean(axis=0)
+    report = [h for h in REPORT_HORIZONS if h <= horizon]
+    result = {"model": model_path, "time_steps": time_steps, "horizon": horizon, "epochs": epochs,
+              "seconds": round(seconds, 1), "test_loss": test_loss,
+              "mse_by_horizon": {h: float(direct_errors[h - 1]) for h in report}}
+    baseline_path = f'models/model_{time_steps}.h5'
+    if os.path.exists(baseline_path):
+        try:
+            baseline_errors = autoregressive_errors(baseline_path, windows, targets)
+            result["autoregressive_mse_by_horizon"] = {h: float(baseline_errors[h - 1]) for h in report}
+        except Exception as e:
+            print(f"Autoregressive baseline {baseline_path} unavailable: {e}")
+            result["autoregressive_mse_by_horizon"] = None
+    print(f"Direct model MSE by horizon: {result['mse_by_horizon']}")
+    return result
+
+def limit_threads(threads):
+    # Pool workers split the cores instead of each using all of them
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset", default=config.TRAINING_DATASET_DIR, help="Prepared dataset directory")
+    parser.add_argument("--rebuild", action="store_true", help="Re-fetch even if the dataset exists")
+    parser.add_argument("--offline", action="store_true", help="Use stored prices without checking upstream")
+    parser.add_argument("--time-steps", type=int, nargs="+",
+                        help=f"Models to train (default {TIME_STEPS_LIST}); with --direct, its window length")
+    parser.add_argument("--direct", action="store_true", help="Train the single multi-horizon model instead")
+    parser.add_argument("--workers", type=int, default=1, help="Train the per-horizon models in this many processes")
+    parser.add_argument("--epochs", type=int, help="Override the default 50 (new) / 10 (fine-tune) epochs")
+    args = parser.parse_args()
+
+    if args.rebuild or not os.path.exists(os.path.join(args.dataset, "bars.npy")):
+        store = PriceStore(stale_after=float("inf") if args.offline else None)
+        build_dataset(args.dataset, store)
+    bars, offsets = load_dataset(args.dataset)
+    print(f"Dataset: {len(offsets) - 1} tickers, {bars.shape[1]} bars")
+    os.makedirs("models", exist_ok=True)
+
+    start = time.perf_counter()
+    failed = {}  # time_steps -> error; a failing horizon does not lose the others' log
+    if args.direct:
+        mode, workers = "direct", 1
+        results = [train_direct(args.dataset, args.epochs, (args.time_steps or [DIRECT_TIME_STEPS])[0])]
+    else:
+        time_steps_list = args.time_steps or TIME_STEPS_LIST
+        mode, workers = "per-horizon", max(1, min(args.workers, len(time_steps_list)))
+        results = []
+        if workers == 1:
+            for time_steps in time_steps_list:
+                try:
+                    results.append(train_horizon(time_steps, args.dataset, args.epochs))
+                except Exception as e:
+                    failed[time_steps] = str(e)
+        else:
+            threads = max(1, (os.cpu_count() or 1) // workers)
+            with process_pool(workers, initializer=limit_threads, initargs=(threads,)) as pool:
+                futures = {pool.submit(train_horizon, time_steps, args.dataset, args.epochs): time_steps
+                           for time_steps in time_steps_list}
+                for future in as_completed(futures):
+                    try:
+                        results.append(future.result())
+                    except Exception as e:
+                        failed[futures[future]] = str(e)
+        for time_steps, error in failed.items():
+            print(f"Training failed for TIME_STEPS={time_steps}: {error}")
+
+    # One line per run, so timing and accuracy can be compared across runs and modes
+    run = {"finished": datetime.now().isoformat(timespec="seconds"), "mode": mode, "workers": workers,
+           "wall_seconds": round(time.perf_counter() - start, 1), "models": [r for r in results if r]}
+    if failed:
+        run["failed"] = failed
+    with open(LOG_PATH, "a") as f:
+        f.write(json.dumps(run) + "\n")
+    print(f"Training complete in {run['wall_seconds']}s, logged to {LOG_PATH}")
 
-print("Model training complete for all TIME_STEPS!")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
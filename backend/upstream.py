@@ -0,0 +1,123 @@
+import random
+import threading
+import time
+
+from yfinance.exceptions import YFRateLimitError
+
+import config
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time; concurrent callers share it.
+
+    The first caller for a key runs `fn(*args)`; everyone who asks for the same
+    key while it is in flight waits and gets the same result (or exception).
+    Nothing is cached once the call returns, so the next caller starts afresh.
+    """
+
+    def __init__(self):
+        self.stats = {"calls": 0, "shared": 0}
+        self._flights = {}  # key -> call in flight
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args):
+        with self._lock:
+            self.stats["calls"] += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.stats["shared"] += 1
+
+        if leader:
+            try:
+                flight.result = fn(*args)
+            except BaseException as e:
+                flight.error = e
+            finally:
+                with self._lock:
+                    del self._flights[key]
+                flight.done.set()
+        else:
+            flight.done.wait()
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+
+def is_rate_limited(error):
+    return isinstance(error, YFRateLimitError) or "Too Many Requests" in str(error)
+
+
+class UpstreamLimiter:
+    """Bounds concurrent upstream calls and backs off when the upstream rate-limits.
+
+    At most `concurrency` calls run at once. A rate-limited call pauses every
+    caller until a shared cooldown passes, then retries; the cooldown doubles
+    (with jitter) on each consecutive rate limit, from `backoff` up to
+    `max_backoff` seconds, and resets on the first success.
+    """
+
+    def __init__(self, concurrency, retries=3, backoff=2.0, max_backoff=60.0):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.stats = {"calls": 0, "rate_limited": 0, "retries": 0}
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._lock = threading.Lock()
+        self._resume_at = 0.0
+        self._strikes = 0  # Consecutive rate limits
+
+    def call(self, fn, *args, **kwargs):
+        for attempt in range(self.retries + 1):
+            with self._slots:
+                self._wait_for_cooldown()
+                with self._lock:
+                    self.stats["calls"] += 1
+                    self.stats["retries"] += attempt > 0
+                try:
+                    result = fn(*args, **kwargs)
+                except Exception as e:
+                    if not is_rate_limited(e):
+                        raise
+                    self._rate_limited()
+                    if attempt == self.retries:
+                        raise
+                    continue
+            with self._lock:
+                self._strikes = 0
+            return result
+
+    def _wait_for_cooldown(self):
+        while True:
+            with self._lock:
+                delay = self._resume_at - time.monotonic()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+    def _rate_limited(self):
+        with self._lock:
+            self.stats["rate_limited"] += 1
+            self._strikes += 1
+            delay = min(self.max_backoff, self.backoff * 2 ** (self._strikes - 1)) * random.uniform(0.5, 1.0)
+            self._resume_at = max(self._resume_at, time.monotonic() + delay)
+        print(f"Upstream rate limit, pausing upstream calls for {delay:.1f}s")
+
+
+# Shared by every price store and fetch in the process
+limiter = UpstreamLimiter(
+    config.UPSTREAM_CONCURRENCY,
+    retries=config.UPSTREAM_RETRIES,
+    backoff=config.UPSTREAM_BACKOFF_SECONDS,
+    max_backoff=config.UPSTREAM_MAX_BACKOFF_SECONDS,
+)
@@ -1,66 +1,275 @@
 import os
+import re
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'   # Suppress warnings
 
-import yfinance as yf
 import numpy as np
 import pandas as pd
-from tensorflow.keras.models import Sequential, load_model
-from tensorflow.keras.layers import LSTM, Dense, Dropout
 from sklearn.preprocessing import MinMaxScaler
+import config
+import metrics
+from numpy_lstm import NumpyLSTM
+from price_store import PriceStore, yahoo_history
+from scaler_cache import ScalerCache
+from scheduler import InferenceScheduler
+from upstream import SingleFlight, limiter
+
+# TensorFlow is only imported for the keras backend; the numpy backend runs
+# the exported weights (see export_models.py) and keeps workers small.
+if config.INFERENCE_BACKEND == "keras":
+    import tensorflow as tf
+    from tensorflow.keras.models import Sequential, load_model
+    from tensorflow.keras.layers import LSTM, Dense, Dropout
 
 models = {}  # Lazy loading dict
+numpy_models = {}  # NumpyLSTM per time_steps
+rollouts = {}  # Compiled forecast graphs per time_steps
+direct_model = {}  # FORECAST_MODEL=direct: forward function, time_steps, horizon
+price_store = PriceStore()  # Cached daily bars, refreshed incrementally
+fetches = SingleFlight()  # Concurrent fetches of one ticker and period share a call
+scaler_cache = ScalerCache(maxsize=config.SCALER_CACHE_SIZE)  # Full-history MinMax per ticker
+
+def build_model(time_steps):
+    # Same architecture as train_model.create_model, used when load_model fails
+    model = Sequential()
+    model.add(LSTM(units=50, return_sequences=True, input_shape=(time_steps, 1)))
+    model.add(Dropout(0.2))
+    model.add(LSTM(units=50, return_sequences=True))
+    model.add(Dropout(0.2))
+    model.add(LSTM(units=50))
+    model.add(Dropout(0.2))
+    model.add(Dense(units=1))
+    return model
 
 def get_model(time_steps):
     if time_steps not in models:
         model_path = f"models/model_{time_steps}.h5"
         if os.path.exists(model_path):
-            try:
-                models[time_steps] = load_model(model_path)
-            except Exception as e:
-                print(f"Error loading model directly: {e}. Attempting to recreate and load weights.")
-                # Recreate the model architecture
-                model = Sequential()
-                model.add(LSTM(units=50, return_sequences=True, input_shape=(time_steps, 1)))
-                model.add(Dropout(0.2))
-                model.add(LSTM(units=50, return_sequences=True))
-                model.add(Dropout(0.2))
-                model.add(LSTM(units=50))
-                model.add(Dropout(0.2))
-                model.add(Dense(units=1))
-                # Load weights
-                model.load_weights(model_path)
-                models[time_steps] = model
+            metrics.MODEL_LOADS.inc("keras", time_steps)
+            with metrics.span("model_load"):
+                try:
+                    models[time_steps] = load_model(model_path)
+                except Exception as e:
+                    print(f"Error loading model directly: {e}. Attempting to recreate and load weights.")
+                    model = build_model(time_steps)
+                    model.load_weights(model_path)
+                    models[time_steps] = model
         else:
             raise ValueError(f"No model found for time_steps={time_steps}. Run train_model.py to create it.")
     return models[time_steps]
 
+def available_time_steps():
+    # Horizons listed in models_info.txt plus any other model_N.h5 on disk
+    time_steps = set()
+    if os.path.exists("models_info.txt"):
+        with open("models_info.txt") as f:
+            time_steps.update(int(m) for m in re.findall(r"value:\s*(\d+)", f.read()))
+    if os.path.isdir("models"):
+        for name in os.listdir("models"):
+            match = re.fullmatch(r"model_(\d+)\.(h5|npz)", name)
+            if match:
+                time_steps.add(int(match.group(1)))
+    return sorted(time_steps)
+
+def warm_up_models():
+    # Load every model and trace its rollout so no request pays for it
+    loaded, failed = [], {}
+    candidates = available_time_steps()
+    if config.FORECAST_MODEL == "direct":
+        try:
+            candidates = [window_length(None)]  # One model answers every time_steps
+        except Exception as e:
+            return loaded, {"direct": str(e)}
+    for time_steps in candidates:
+        try:
+            run_rollout(time_steps, np.zeros((1, time_steps, 1), dtype=np.float32), 1)
+            loaded.append(time_steps)
+        except Exception as e:
+            print(f"Warm-up failed for time_steps={time_steps}: {e}")
+            failed[time_steps] = str(e)
+    return loaded, failed
+
 def fetch_historical_data(ticker, period="max"):
     try:
-        data = yf.download(ticker, period=period, progress=False, auto_adjust=False)
-        data.columns = data.columns.get_level_values(0)
-        data = data.dropna(subset=['Close'])
-        if data.empty:
-            return None
-        return data
+        return fetches.do((ticker.upper(), period), _fetch_historical_data, ticker, period)
     except Exception:
         return None
 
-def prepare_data_for_prediction(historical_data, time_steps):
-    scaler = MinMaxScaler(feature_range=(0, 1))
-    scaled_data = scaler.fit_transform(historical_data['Close'].values.reshape(-1, 1))
-    if len(scaled_data) < time_steps:
+def _fetch_historical_data(ticker, period):
+    if period == "max":
+        return price_store.get(ticker)
+    return limiter.call(yahoo_history, ticker, period=period)
+
+def prepare_data_for_prediction(historical_data, time_steps, ticker=None):
+    # With a ticker the scaler comes from scaler_cache and only the window is
+    # scaled; without one it is fitted over the whole history
+    time_steps = window_length(time_steps)
+    close = historical_data['Close']
+    if ticker is None:
+        scaler = MinMaxScaler(feature_range=(0, 1)).fit(close.values.reshape(-1, 1))
+    else:
+        scaler = scaler_cache.fit(ticker.upper(), close)
+    if len(close) < time_steps:
         raise ValueError("Not enough data for prediction")
-    input_data = scaled_data[-time_steps:].reshape(1, time_steps, 1)
+    tail = close.to_numpy(dtype=np.float64)[-time_steps:]
+    input_data = (tail * scaler.scale_ + scaler.min_).reshape(1, time_steps, 1)  # MinMaxScaler.transform
     return input_data, scaler
 
+def get_rollout(time_steps):
+    # Whole autoregressive forecast as one traced graph: the window slides inside
+    # tf.while_loop, so there is no per-day predict() call or numpy reallocation.
+    if time_steps not in rollouts:
+        model = get_model(time_steps)
+
+        @tf.function(input_signature=[
+            tf.TensorSpec([None, time_steps, 1], tf.float32),
+            tf.TensorSpec([], tf.int32),
+        ])
+        def rollout(window, predict_days):
+            preds = tf.TensorArray(tf.float32, size=predict_days, element_shape=tf.TensorShape([None]))
+
+            def step(i, window, preds):
+                pred = model(window, training=False)
+                window = tf.concat([window[:, 1:, :], pred[:, :, None]], axis=1)
+                return i + 1, window, preds.write(i, pred[:, 0])
+
+            _, _, preds = tf.while_loop(lambda i, *_: i < predict_days, step, [tf.constant(0), window, preds])
+            return tf.transpose(preds.stack())  # (batch, predict_days)
+
+        metrics.MODEL_LOADS.inc("rollout_graph", time_steps)  # Traced on its first call
+        rollouts[time_steps] = rollout
+    return rollouts[time_steps]
+
+def get_numpy_model(time_steps):
+    if time_steps not in numpy_models:
+        npz_path = f"models/model_{time_steps}.npz"
+        h5_path = f"models/model_{time_steps}.h5"
+        if not os.path.exists(npz_path) and not os.path.exists(h5_path):
+            raise ValueError(f"No model found for time_steps={time_steps}. Run train_model.py to create it.")
+        metrics.MODEL_LOADS.inc("numpy", time_steps)
+        with metrics.span("model_load"):
+            numpy_models[time_steps] = load_numpy_lstm(f"models/model_{time_steps}")
+    return numpy_models[time_steps]
+
+def numpy_model_file(path):
+    # path.npz from export_models.py, unless train_model.py saved path.h5 after
+    # it: a retrained model is served from its .h5 until it is re-exported
+    npz_path, h5_path = path + ".npz", path + ".h5"
+    if os.path.exists(npz_path) and (not os.path.exists(h5_path)
+                                     or os.path.getmtime(npz_path) >= os.path.getmtime(h5_path)):
+        return npz_path
+    return h5_path
+
+def load_numpy_lstm(path):
+    model_file = numpy_model_file(path)
+    if model_file.endswith(".npz"):
+        return NumpyLSTM.from_npz(model_file)
+    return NumpyLSTM.from_h5(model_file)
+
+def get_direct_model():
+    # models/model_direct_N.{npz,h5} (train_model.py --direct): an N-day window
+    # in, the next `horizon` days out in one forward pass
+    if not direct_model:
+        found = {}
+        for name in os.listdir("models") if os.path.isdir("models") else []:
+            match = re.fullmatch(r"model_direct_(\d+)\.(h5|npz)", name)
+            if match:
+                found.setdefault(int(match.group(1)), set()).add(match.group(2))
+        if not found:
+            raise ValueError("No direct model found. Run train_model.py --direct to create it.")
+        time_steps = max(found)
+        path = f"models/model_direct_{time_steps}"
+        metrics.MODEL_LOADS.inc("direct", time_steps)
+        if config.INFERENCE_BACKEND == "numpy":
+            model = load_numpy_lstm(path)
+            forward, horizon = model.predict, model.dense_kernel.shape[1]
+        else:
+            model = load_model(path + ".h5")
+            graph = tf.function(lambda window: model(window, training=False),
+                                input_signature=[tf.TensorSpec([None, time_steps, 1], tf.float32)])
+            forward, horizon = (lambda window: graph(window).numpy()), model.output_shape[-1]
+        direct_model.update(forward=forward, time_steps=time_steps, horizon=horizon, path=path)
+    return direct_model
+
+def model_signature(time_steps):
+    # Which model a forecast for time_steps comes from under the current
+    # settings: FORECAST_MODEL, INFERENCE_BACKEND and the file the backend
+    # loads, with its mtime. None when there is no such model.
+    try:
+        path = get_direct_model()["path"] if config.FORECAST_MODEL == "direct" else f"models/model_{time_steps}"
+    except ValueError:
+        return None
+    model_file = numpy_model_file(path) if config.INFERENCE_BACKEND == "numpy" else path + ".h5"
+    try:
+        mtime = os.path.getmtime(model_file)
+    except OSError:
+        return None
+    return f"{config.FORECAST_MODEL}/{config.INFERENCE_BACKEND}/{model_file}@{mtime}"
+
+def window_length(time_steps):
+    # Window the forecast reads: the direct model has one fixed length
+    if config.FORECAST_MODEL == "direct":
+        return get_direct_model()["time_steps"]
+    return time_steps
+
+def run_direct(windows, predict_days):
+    # Blocks of `horizon` days per forward pass; past the horizon the window
+    # continues from the model's own output, as the autoregressive loop does
+    model = get_direct_model()
+    windows = np.asarray(windows, dtype=np.float32)[:, -model["time_steps"]:, 0]
+    blocks = []
+    for _ in range(0, predict_days, model["horizon"]):
+        block = np.asarray(model["forward"](windows[:, :, None]), dtype=np.float32)
+        blocks.append(block)
+        windows = np.concatenate([windows, block], axis=1)[:, -model["time_steps"]:]
+    if not blocks:
+        return np.zeros((len(windows), 0), dtype=np.float32)
+    return np.concatenate(blocks, axis=1)[:, :predict_days]
+
+def run_rollout(time_steps, windows, predict_days):
+    if config.FORECAST_MODEL == "direct":
+        return run_direct(windows, predict_days)
+    if config.INFERENCE_BACKEND == "numpy":
+        return get_numpy_model(time_steps).rollout(windows, predict_days)
+    rollout = get_rollout(time_steps)  # Load lazily
+    return rollout(windows, np.int32(predict_days)).numpy()
+
+scheduler = InferenceScheduler(
+    run_rollout,
+    max_wait=config.INFERENCE_BATCH_WAIT_MS / 1000,
+    max_batch=config.INFERENCE_MAX_BATCH,
+)
+
 def make_prediction(input_data, scaler, predict_days, time_steps):
-    model = get_model(time_steps)  # Load lazily
-    predictions = []
-    current_input = input_data.copy()
-    for _ in range(predict_days):
-        pred = model.predict(current_input, verbose=0)
-        predictions.append(pred[0][0])
-        pred_reshaped = pred.reshape(1, 1, 1)
-        current_input = np.append(current_input[:, 1:, :], pred_reshaped, axis=1)
-    predictions = scaler.inverse_transform(np.array(predictions).reshape(-1, 1)).flatten()
-    return predictions
\ No newline at end of file
+    time_steps = window_length(time_steps)
+    if predict_days <= 0:
+        return np.array([])
+    # Concurrent requests for the same model share one batched rollout
+    predictions = scheduler.submit(time_steps, input_data, predict_days)
+    predictions = scaler.inverse_transform(predictions.reshape(-1, 1)).flatten()
+    return predictions
+
+def iter_prediction(input_data, scaler, predict_days, time_steps, chunk_days):
+    # Same forecast as make_prediction, yielded chunk_days at a time. Each
+    # rollout continues from the window the previous one ended on: one per
+    # chunk for the autoregressive models, one per `horizon` block for the
+    # direct model, whose blocks are then sliced into chunks
+    time_steps = window_length(time_steps)
+    block_days = get_direct_model()["horizon"] if config.FORECAST_MODEL == "direct" else chunk_days
+    window = np.asarray(input_data, dtype=np.float32).reshape(time_steps)
+    done = 0
+    while done < predict_days:
+        days = min(block_days, predict_days - done)
+        scaled = scheduler.submit(time_steps, window.reshape(1, time_steps, 1), days)
+        window = np.concatenate([window, scaled])[-time_steps:]
+        done += days
+        for start in range(0, days, chunk_days):
+            yield scaler.inverse_transform(scaled[start:start + chunk_days].reshape(-1, 1)).flatten()
+
+def make_batch_prediction(inputs, scalers, predict_days, time_steps):
+    # One rollout for many tickers' windows; each row is unscaled with its own scaler
+    time_steps = window_length(time_steps)
+    if predict_days <= 0:
+        return [np.array([]) for _ in scalers]
+    windows = np.concatenate([np.asarray(x, dtype=np.float32).reshape(1, time_steps, 1) for x in inputs])
+    scaled = run_rollout(time_steps, windows, predict_days)
+    return [scaler.inverse_transform(row.reshape(-1, 1)).flatten() for scaler, row in zip(scalers, scaled)]
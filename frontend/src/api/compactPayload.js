@@ -0,0 +1,62 @@
+// Decoder for the backend's compact /predict encoding (?format=compact).
+// Dates arrive as a start date plus base64 int32 offsets (business days for
+// unit "B", calendar days for "D"); series arrive as base64 float32 arrays.
+// The result has the same shape as the plain JSON response.
+
+function base64ToBuffer(encoded) {
+  const binary = atob(encoded || "");
+  const bytes = new Uint8Array(binary.length);
+  for (let i = 0; i < binary.length; i++) {
+    bytes[i] = binary.charCodeAt(i);
+  }
+  return bytes.buffer;
+}
+
+// Typed arrays use the platform byte order, which is little-endian on every
+// browser target, matching the backend's '<f4' / '<i4' encoding.
+function decodeFloats(encoded) {
+  const values = new Float32Array(base64ToBuffer(encoded));
+  // float32 -> 7 significant digits, NaN -> null as in the JSON response
+  return Array.from(values, (v) => (Number.isNaN(v) ? null : Number(v.toPrecision(7))));
+}
+
+function decodeDates({ start, unit, offsets }) {
+  if (!start) return [];
+  const steps = new Int32Array(base64ToBuffer(offsets));
+  const date = new Date(`${start}T00:00:00Z`);
+  const dates = new Array(steps.length);
+  let position = 0;
+  for (let i = 0; i < steps.length; i++) {
+    while (position < steps[i]) {
+      date.setUTCDate(date.getUTCDate() + 1);
+      const day = date.getUTCDay();
+      if (unit === "D" || (day !== 0 && day !== 6)) position++;
+    }
+    dates[i] = date.toISOString().slice(0, 10);
+  }
+  return dates;
+}
+
+export function decodeCompactPrediction(payload) {
+  if (!payload || payload.encoding !== "compact-v1") return payload;
+  const indicators = {};
+  Object.entries(payload.indicators || {}).forEach(([key, value]) => {
+    indicators[key] =
+      typeof value === "string"
+        ? decodeFloats(value)
+        : Object.fromEntries(Object.entries(value).map(([k, v]) => [k, decodeFloats(v)]));
+  });
+  const decoded = {
+    historical: {
+      dates: decodeDates(payload.historical.dates),
+      prices: decodeFloats(payload.historical.prices),
+    },
+    predicted: {
+      dates: decodeDates(payload.predicted.dates),
+      prices: decodeFloats(payload.predicted.prices),
+    },
+    indicators,
+  };
+  if (payload.error) decoded.error = payload.error;
+  return decoded;
+}
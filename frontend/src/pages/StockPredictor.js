@@ -1,6 +1,7 @@
 import React, { useState } from "react";
 import axios from "axios";
 import StockChart from "../components/StockChart.js";
+import { decodeCompactPrediction } from "../api/compactPayload.js";
 import { Helmet } from "react-helmet";
 import './StockPredictor.css';
 
@@ -164,13 +165,14 @@ function StockPredictor() {
     setData(null);
     setSuggestions([]);
     try {
-      const response = await axios.post(`${BACKEND_URL}/predict`, {
+      // Compact encoding keeps the full "max" history at a fraction of the JSON size
+      const response = await axios.post(`${BACKEND_URL}/predict?format=compact`, {
         ticker,
         period: "max",
         time_steps: selectedModel,
         predict_days: predictDays,
       });
-      const resData = response.data;
+      const resData = decodeCompactPrediction(response.data);
       setData(resData);
       if (resData.error) {
         setError(resData.error);